@@ -0,0 +1,141 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+from cache_columnar import CARPETA_CACHE, escribir_atomico, hash_archivo
+from ingesta import ingerir
+
+# ============================================================
+# === ALMACÉN INCREMENTAL DE TOTALES MENSUALES ===============
+# ============================================================
+# Cada archivo de transacciones es una partición. El almacén guarda por
+# partición un punto de control (mtime, tamaño, sha256) y los totales
+# mensuales de 'Vlr Total' que aporta. Al actualizar solo se leen las
+# particiones nuevas o modificadas; la serie final es la suma por mes de
+# todas las particiones, así que agregar un mes de ventas (un archivo
+# nuevo en transacciones/) cuesta lo que ese archivo y no todo el histórico.
+
+FUENTES_TRANSACCIONES = [
+    'MachineLearning.xlsx',
+    os.path.join('transacciones', '*.xlsx'),
+    os.path.join('transacciones', '*.csv'),
+    os.path.join('transacciones', '*.parquet'),
+]
+
+RUTA_ALMACEN = os.path.join(CARPETA_CACHE, 'agregados_mensuales.json')
+
+
+def totales_por_mes(df):
+    """{'AAAA-MM-DD' (fin de mes): suma de Vlr Total} de un lote de transacciones."""
+    fechas = pd.to_datetime(df['Fecha']).dt.to_period('M').dt.to_timestamp('M')
+    suma = df['Vlr Total'].groupby(fechas).sum()
+    return {fecha.strftime('%Y-%m-%d'): float(valor) for fecha, valor in suma.items()}
+
+
+def totales_de_archivo(ruta):
+    """Totales mensuales de un archivo, leído por lotes (memoria acotada)."""
+    totales = {}
+    for lote in ingerir(ruta, ['Fecha', 'Vlr Total']):
+        for mes, valor in totales_por_mes(lote).items():
+            totales[mes] = totales.get(mes, 0.0) + valor
+    return totales
+
+
+def expandir_fuentes(patrones):
+    """Rutas existentes que coinciden con los patrones, sin repetir y ordenadas."""
+    rutas = set()
+    for patron in patrones:
+        rutas.update(p for p in glob.glob(patron) if os.path.isfile(p))
+    return sorted(rutas)
+
+
+class AlmacenMensual:
+    """Totales mensuales persistentes con puntos de control por partición."""
+
+    def __init__(self, ruta=RUTA_ALMACEN, agregador=totales_de_archivo):
+        self.ruta = ruta
+        self.agregador = agregador
+        self._lock = threading.Lock()
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                self.particiones = json.load(f).get('particiones', {})
+        except (OSError, ValueError):
+            self.particiones = {}
+
+    @property
+    def version(self):
+        """Huella del estado del almacén (cambia cuando cambia alguna partición)."""
+        firma = sorted((ruta, p['sha256']) for ruta, p in self.particiones.items())
+        return hashlib.sha1(json.dumps(firma).encode()).hexdigest()[:16]
+
+    def actualizar(self, patrones=FUENTES_TRANSACCIONES):
+        """Ingiere solo las particiones nuevas o modificadas. Devuelve las rutas releídas.
+
+        Es seguro llamarla desde varios hilos sobre el mismo almacén: una
+        actualización a la vez, y self.particiones se reemplaza entero al
+        final, así que version y serie() nunca recorren un dict a medio cambiar.
+        """
+        with self._lock:
+            return self._actualizar(patrones)
+
+    def _actualizar(self, patrones):
+        rutas = expandir_fuentes(patrones)
+        particiones = dict(self.particiones)
+        releidas = []
+        cambio = False
+
+        for ruta in rutas:
+            estado = os.stat(ruta)
+            previa = particiones.get(ruta)
+            if previa and previa['mtime_ns'] == estado.st_mtime_ns and previa['tamano'] == estado.st_size:
+                continue
+
+            sha = hash_archivo(ruta)
+            if previa and previa['sha256'] == sha:
+                meses = previa['meses']          # solo cambió la fecha del archivo
+            else:
+                meses = self.agregador(ruta)
+                releidas.append(ruta)
+
+            particiones[ruta] = {
+                'mtime_ns': estado.st_mtime_ns,
+                'tamano': estado.st_size,
+                'sha256': sha,
+                'meses': meses
+            }
+            cambio = True
+
+        # Particiones cuyo archivo ya no existe
+        for ruta in set(particiones) - set(rutas):
+            del particiones[ruta]
+            cambio = True
+
+        if cambio:
+            self.particiones = particiones      # asignación atómica para los lectores
+            self._guardar()
+        return releidas
+
+    def _guardar(self):
+        def escribir(temporal):
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'particiones': self.particiones}, f)
+        escribir_atomico(self.ruta, escribir)
+
+    def serie(self):
+        """DataFrame mensual continuo (índice Fecha, columna Vlr Total), como resample('ME').sum()."""
+        totales = {}
+        for particion in self.particiones.values():
+            for mes, valor in particion['meses'].items():
+                totales[mes] = totales.get(mes, 0.0) + valor
+
+        serie = pd.Series(totales, dtype=float)
+        serie.index = pd.to_datetime(serie.index)
+        serie = serie.sort_index()
+        if not serie.empty:
+            serie = serie.asfreq('ME', fill_value=0.0)
+        serie.index.name = 'Fecha'
+        return serie.to_frame('Vlr Total')
@@ -1,48 +1,136 @@
-from flask import Flask, jsonify, request
+import arranque  # primero: con PERFIL_ARRANQUE=1 mide las importaciones siguientes
+
+import hashlib
+import itertools
+import os
+import threading
+
+from flask import Flask, Response, request
+import numpy as np
 import pandas as pd
-import joblib
+
+import consultas
+from agregados_mensuales import AlmacenMensual
+from cache_http import CacheRespuestas
+from exportacion import FORMATOS_EXPORTACION, exportar
+from graficos import FORMATOS_GRAFICO, GraficoPrediccion
+from metricas import Metricas
+from preprocesamiento import reemplazar_outliers_iqr
+from pronostico import NIVEL_POR_DEFECTO
+from recursos import Recurso
+from repositorio import Repositorio
+from segmentacion import asignar_clusters, matriz_variables
+from serializacion import respuesta_json, tabla_json
 
 # ============================================================
 # === CREAR LA APP ===========================================
 # ============================================================
 app = Flask(__name__) #, static_url_path='/static', static_folder='static'
 
+# Latencia, tamaño y errores por endpoint en /metrics (ver metricas.py)
+metricas = Metricas(ruta_log=os.environ.get('API_LOG_PETICIONES'))
+metricas.instalar(app)
+
 
 # ============================================================
-# === SECCIÓN 1: CARGAR ARCHIVOS EXCEL (CLIENTES & CLUSTERS) =
+# === SECCIÓN 1: CARGAR DATOS Y MODELOS ======================
 # ============================================================
+# Excel (clientes & clusters), MachineLearning.joblib e índices viven
+# en una instantánea del repositorio. Cada endpoint la lee UNA vez al
+# empezar (d = repo.actual), así una recarga en caliente nunca mezcla
+# datos viejos y nuevos dentro de la misma petición. Las consultas en
+# sí están en consultas.py, compartidas con streamlit_app.py.
+
+repo = Repositorio()
+
+# Caché de respuestas: se invalida cuando cambia la versión de los datos
+cache_respuestas = CacheRespuestas(max_age=int(os.environ.get('API_CACHE_MAX_AGE', 60)))
+repo.al_recargar.append(lambda d: cache_respuestas.fijar_version(d.version, d.ultima_modificacion))
+repo.al_recargar.append(lambda d: setattr(metricas, 'tiempos_carga', d.tiempos_carga))
+
+with arranque.fase('cargar datos'):
+    repo.cargar()
 
-DATA_PATH_RFM = 'resultado_rfm.xlsx'
-DATA_PATH_PERFIL = 'perfil_clusters_rfm.xlsx'
 
-try:
-    df_rfm = pd.read_excel(DATA_PATH_RFM)
-    print(f"✅ Archivo '{DATA_PATH_RFM}' cargado correctamente con {len(df_rfm)} registros.")
-except Exception as e:
-    print(f"❌ Error al cargar '{DATA_PATH_RFM}': {e}")
-    df_rfm = pd.DataFrame()
+def precargar():
+    """Construye lo que la instantánea difiere hasta la primera consulta (índice de búsqueda).
+
+    servidor.py la llama en el proceso maestro antes del fork, para que los
+    workers compartan esas estructuras en lugar de construir cada uno la suya.
+    """
+    with arranque.fase('precargar índice de búsqueda'):
+        repo.actual.indices['busqueda'].preparar()
 
-try:
-    df_perfil = pd.read_excel(DATA_PATH_PERFIL)
-    print(f"✅ Archivo '{DATA_PATH_PERFIL}' cargado correctamente con {len(df_perfil)} registros.")
-except Exception as e:
-    print(f"❌ Error al cargar '{DATA_PATH_PERFIL}': {e}")
-    df_perfil = pd.DataFrame()
 
 # ============================================================
-# === SECCIÓN 2: CARGAR MODELO JOBLIB ========================
+# === SECCIÓN 2: RECARGA EN CALIENTE =========================
 # ============================================================
+# API_RECARGA_SEGUNDOS: cada cuánto revisa el vigilante si cambiaron
+# los archivos (0 lo desactiva). POST /admin/recargar fuerza la
+# revisión con la cabecera X-Token-Admin igual a API_TOKEN_ADMIN.
+
+def iniciar_recarga_automatica():
+    """Arranca el vigilante de archivos (una vez por proceso/worker)."""
+    repo.iniciar_vigilante(int(os.environ.get('API_RECARGA_SEGUNDOS', 30)))
+
+
+# ============================================================
+# === SECCIÓN 2.2: PAGINACIÓN Y PROYECCIÓN DE CAMPOS =========
+# ============================================================
+# Parámetros comunes de los endpoints de listas:
+#   ?offset=0&limit=100   -> ventana de resultados (limit <= LIMITE_MAXIMO)
+#   ?fields=Cliente,recency -> columnas de df_rfm a devolver por registro
+
+LIMITE_POR_DEFECTO = 1000
+LIMITE_MAXIMO = 5000
 
-try:
-    data_joblib = joblib.load('MachineLearning.joblib')
-    model = data_joblib.get('modelo')
-    m = data_joblib.get('m')
-    b = data_joblib.get('b')
-    df_model = data_joblib.get('data')
-    print("✅ Archivo 'MachineLearning.joblib' cargado correctamente.")
-except Exception as e:
-    print("❌ Error al cargar el archivo MachineLearning.joblib:", e)
-    data_joblib, model, m, b, df_model = None, None, None, None, None
+
+def _paginacion():
+    """(offset, limit) de la query string, con limit acotado."""
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', LIMITE_POR_DEFECTO))
+    except ValueError:
+        raise ValueError("'offset' y 'limit' deben ser enteros") from None
+    return max(offset, 0), min(max(limit, 0), LIMITE_MAXIMO)
+
+
+def _campos(d, por_defecto=None):
+    """Columnas pedidas en ?fields=, o por_defecto si no se indicaron."""
+    texto = request.args.get('fields')
+    if not texto:
+        return por_defecto
+    campos = [c.strip() for c in texto.split(',') if c.strip()]
+    desconocidos = [c for c in campos if c not in d.df_rfm.columns]
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}")
+    return campos
+
+
+def _info_pagina(total, offset, limit):
+    siguiente = offset + limit if offset + limit < total else None
+    return {'total': total, 'offset': offset, 'limit': limit, 'siguiente': siguiente}
+
+
+def _formato():
+    """Forma de las tablas en la respuesta: ?formato=records (defecto) o split."""
+    return request.args.get('formato', 'records')
+
+
+def _registros(d, filas, campos):
+    return tabla_json(d.df_rfm[campos].iloc[filas], _formato())
+
+
+def _clientes_paginados(d, grupo):
+    """Página de un grupo de clientes: nombres, o registros si hay ?fields=."""
+    offset, limit = _paginacion()
+    campos = _campos(d)
+    tramo = slice(offset, offset + limit)
+    if campos is None:
+        clientes = grupo['clientes'][tramo]
+    else:
+        clientes = _registros(d, grupo['filas'][tramo], campos)
+    return clientes, _info_pagina(len(grupo['filas']), offset, limit)
 
 
 # ============================================================
@@ -51,20 +139,28 @@ except Exception as e:
 
 @app.route('/')
 def home():
-    return jsonify({
+    return respuesta_json({
         "status": "✅ API combinada funcionando correctamente",
         "endpoints_disponibles": [
             "/info",
             "/predict",
+            "/forecast?horizonte=12&nivel=0.95",
+            "/assign_cluster",
+            "/grafico_prediccion?meses=6&formato=png|svg",
             "/clientes",
             "/cliente/<nombre_cliente>",
+            "/buscar_clientes?q=<texto>&k=10",
             "/departamentos",
             "/clientes_por_departamento/<departamento>",
             "/clusters",
             "/clientes_por_cluster/<cluster>",
             "/perfil_clusters",
             "/meses_favoritos",
-            "/clientes_por_mes/<mes>"
+            "/clientes_por_mes/<mes>",
+            "/agregados?por=&metricas=&filtro=",
+            "/export?formato=csv|ndjson|arrow&departamento=&cluster=&mes=",
+            "/imagen_descargar?ancho=&formato=webp|png",
+            "/metrics"
         ]
     })
 
@@ -74,25 +170,191 @@ def home():
 # ============================================================
 
 @app.route('/info', methods=['GET'])
+@cache_respuestas.memorizar
 def info():
-    if df_model is not None:
-        return jsonify({
-            'filas': len(df_model),
-            'm': m,
-            'b': b
+    d = repo.actual
+    if d.df_model is not None:
+        return respuesta_json({
+            'filas': len(d.df_model),
+            'm': d.m,
+            'b': d.b
         })
     else:
-        return jsonify({'error': 'No se pudo cargar el archivo MachineLearning.joblib.'})
+        return respuesta_json({'error': 'No se pudo cargar el archivo MachineLearning.joblib.'}, 500)
+
+MAX_PUNTOS_PREDICCION = 10000
+
+
+def _cuerpo_json():
+    """Cuerpo JSON de la petición; ValueError (-> 400) si no es un objeto JSON."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("el cuerpo debe ser un objeto JSON")
+    return data
+
+
+def _valores_x(data):
+    """Arreglo de x del cuerpo: lista en 'x' o rango 'inicio'/'fin'/'paso'."""
+    if 'x' in data:
+        xs = np.asarray(data['x'], dtype=float)
+        if xs.ndim != 1 or not np.isfinite(xs).all():
+            raise ValueError("'x' debe ser un número o una lista plana de números")
+        return xs
+    inicio, fin = float(data['inicio']), float(data['fin'])
+    paso = float(data.get('paso', 1))
+    if paso == 0:
+        raise ValueError("'paso' no puede ser 0")
+    if (fin - inicio) / paso > MAX_PUNTOS_PREDICCION:
+        raise ValueError(f"El rango supera {MAX_PUNTOS_PREDICCION} puntos")
+    return np.arange(inicio, fin, paso)
+
 
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        data = request.get_json()
-        x = float(data['x'])
-        y_pred = m * x + b
-        return jsonify({'x': x, 'y_pred': y_pred})
+        d = repo.actual
+        data = _cuerpo_json()
+
+        # Contrato original: un solo valor -> un solo y_pred
+        if 'x' in data and np.ndim(data['x']) == 0:
+            x = float(data['x'])
+            y_pred = consultas.predecir(d, x)
+            if y_pred is None:
+                return respuesta_json({'error': 'No se pudo cargar el archivo MachineLearning.joblib.'}, 500)
+            return respuesta_json({'x': x, 'y_pred': y_pred})
+
+        # Modo lote: todos los x se evalúan en una sola operación vectorizada
+        xs = _valores_x(data)
+        if xs.size > MAX_PUNTOS_PREDICCION:
+            raise ValueError(f"Se admiten como máximo {MAX_PUNTOS_PREDICCION} valores de x")
+        y_pred = consultas.predecir(d, xs)
+        if y_pred is None:
+            return respuesta_json({'error': 'No se pudo cargar el archivo MachineLearning.joblib.'}, 500)
+        return respuesta_json({'x': xs.tolist(), 'y_pred': y_pred.tolist()})
+    except (KeyError, TypeError, ValueError) as e:
+        return respuesta_json({'error': f"Petición inválida: {e}"}, 400)
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+
+@app.route('/forecast', methods=['GET'])
+@cache_respuestas.memorizar
+def forecast():
+    try:
+        try:
+            horizonte = int(request.args.get('horizonte', 12))
+            nivel = float(request.args.get('nivel', NIVEL_POR_DEFECTO))
+        except ValueError:
+            raise ValueError("'horizonte' debe ser entero y 'nivel' numérico") from None
+
+        tabla = consultas.pronostico(repo.actual, horizonte, nivel)
+        if tabla is None:
+            return respuesta_json({'error': 'No se pudo cargar el archivo MachineLearning.joblib.'}, 500)
+        return respuesta_json({
+            'horizonte': horizonte,
+            'nivel': nivel,
+            'pronostico': tabla_json(tabla, _formato())
+        })
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+
+# ============================================================
+# === SECCIÓN 4.0: GRÁFICO DEL MODELO + PREDICCIÓN ===========
+# ============================================================
+# La serie mensual limpia se recalcula solo cuando cambia el almacén de
+# agregados; el gráfico lo compone GraficoPrediccion (capa base por
+# versión + predicción del horizonte pedido, con LRU de imágenes).
+
+almacen_ventas = AlmacenMensual()
+graficos = GraficoPrediccion()
+_serie_ventas = {'version': None, 'serie': None}
+_lock_serie = threading.Lock()
+
+
+def _serie_limpia():
+    """(versión del almacén, serie mensual sin outliers)."""
+    with _lock_serie:
+        almacen_ventas.actualizar()
+        if _serie_ventas['version'] != almacen_ventas.version:
+            serie = almacen_ventas.serie()['Vlr Total']
+            _serie_ventas.update(version=almacen_ventas.version, serie=reemplazar_outliers_iqr(serie))
+        return _serie_ventas['version'], _serie_ventas['serie']
+
+
+@app.route('/grafico_prediccion', methods=['GET'])
+def grafico_prediccion():
+    try:
+        d = repo.actual
+        if d.m is None or d.b is None:
+            return respuesta_json({'error': 'No se pudo cargar el archivo MachineLearning.joblib.'}, 500)
+        try:
+            meses = int(request.args.get('meses', 6))
+        except ValueError:
+            raise ValueError("'meses' debe ser un entero") from None
+        formato = request.args.get('formato', 'png')
+
+        version_serie, serie = _serie_limpia()
+        version = f'{version_serie}:{d.version}'
+        imagen = graficos.renderizar(version, serie, d.m, d.b, meses, formato)
+
+        respuesta = Response(imagen, mimetype=FORMATOS_GRAFICO[formato])
+        respuesta.set_etag(hashlib.blake2b(f'{version}:{meses}:{formato}'.encode(), digest_size=12).hexdigest())
+        respuesta.cache_control.public = True
+        respuesta.cache_control.max_age = cache_respuestas.max_age
+        return respuesta.make_conditional(request)
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+
+# ============================================================
+# === SECCIÓN 4.1: ASIGNACIÓN DE CLUSTERS RFM ================
+# ============================================================
+# POST /assign_cluster con las variables de modelo_cluster_rfm.joblib:
+#   {"recency": 30, "frequency": 12, ...}            -> un cliente
+#   {"registros": [{...}, {...}]}                    -> lote por filas
+#   {"columnas": {"recency": [...], ...}}            -> lote por columnas
+# Todo el lote se escala y se predice en una sola llamada vectorizada.
+
+MAX_REGISTROS_CLUSTER = 100_000
+
+
+def _tabla_variables(data):
+    """(DataFrame de variables, es_lote) a partir del cuerpo de la petición."""
+    if 'registros' in data:
+        return pd.DataFrame.from_records(data['registros']), True
+    if 'columnas' in data:
+        return pd.DataFrame(data['columnas']), True
+    return pd.DataFrame([data]), False
+
+
+@app.route('/assign_cluster', methods=['POST'])
+def assign_cluster():
+    try:
+        d = repo.actual
+        if d.modelo_cluster is None:
+            return respuesta_json({'error': 'No se pudo cargar modelo_cluster_rfm.joblib.'}, 503)
+
+        tabla, es_lote = _tabla_variables(_cuerpo_json())
+        if len(tabla) > MAX_REGISTROS_CLUSTER:
+            raise ValueError(f"Se admiten como máximo {MAX_REGISTROS_CLUSTER} registros")
+        if tabla.empty:
+            return respuesta_json({'Cluster_RFM': []})
+
+        X = matriz_variables(tabla, d.modelo_cluster['variables'])
+        clusters = asignar_clusters(X, d.modelo_cluster)
+
+        if not es_lote:
+            return respuesta_json({'Cluster_RFM': int(clusters[0])})
+        return respuesta_json({'Cluster_RFM': clusters})
+    except (KeyError, TypeError, ValueError) as e:
+        return respuesta_json({'error': f"Petición inválida: {e}"}, 400)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 
 # ============================================================
@@ -100,112 +362,332 @@ def predict():
 # ============================================================
 
 @app.route('/clientes', methods=['GET'])
+@cache_respuestas.memorizar
 def listar_clientes():
     try:
-        clientes = df_rfm['Cliente'].dropna().unique().tolist()
-        return jsonify({'clientes': clientes})
+        d = repo.actual
+        clientes, pagina = _clientes_paginados(d, d.indices['todos'])
+        return respuesta_json({'clientes': clientes, 'paginacion': pagina})
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/cliente/<string:nombre_cliente>', methods=['GET'])
+@cache_respuestas.memorizar
 def obtener_cliente(nombre_cliente):
     try:
-        cliente_data = df_rfm[df_rfm['Cliente'].astype(str).str.lower() == nombre_cliente.lower()]
-        if cliente_data.empty:
-            return jsonify({'error': f"No se encontró el cliente '{nombre_cliente}'"}), 404
-        return jsonify(cliente_data.to_dict(orient='records')[0])
+        cliente_data = consultas.obtener_cliente(repo.actual, nombre_cliente)
+        if cliente_data is None:
+            return respuesta_json({'error': f"No se encontró el cliente '{nombre_cliente}'"}, 404)
+        return respuesta_json(cliente_data)
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+# Búsqueda incremental para autocompletar: se resuelve con el índice de
+# prefijos y trigramas de la instantánea (ver busqueda.py). No pasa por la
+# caché de respuestas: cada tecla es una consulta distinta.
+K_BUSQUEDA = 10
+K_BUSQUEDA_MAXIMO = 50
+
+@app.route('/buscar_clientes', methods=['GET'])
+def buscar_clientes():
+    try:
+        texto = request.args.get('q', '')
+        try:
+            k = int(request.args.get('k', K_BUSQUEDA))
+        except ValueError:
+            raise ValueError("'k' debe ser un entero") from None
+        k = min(max(k, 0), K_BUSQUEDA_MAXIMO)
+        return respuesta_json({'q': texto, 'resultados': consultas.buscar_clientes(repo.actual, texto, k)})
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/departamentos', methods=['GET'])
+@cache_respuestas.memorizar
 def listar_departamentos():
     try:
-        departamentos = df_rfm['Departamento'].dropna().unique().tolist()
-        return jsonify({'departamentos': departamentos})
+        departamentos = consultas.listar_departamentos(repo.actual)
+        return respuesta_json({'departamentos': departamentos})
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/clientes_por_departamento/<string:departamento>', methods=['GET'])
+@cache_respuestas.memorizar
 def clientes_por_departamento(departamento):
     try:
-        clientes = (
-            df_rfm[df_rfm['Departamento'].astype(str).str.lower() == departamento.lower()]
-            ['Cliente'].dropna().unique().tolist()
-        )
-        return jsonify({'clientes': clientes})
+        d = repo.actual
+        grupo = consultas.grupo(d, 'departamento', departamento)
+        if grupo is None:
+            return respuesta_json({'clientes': []})
+        clientes, pagina = _clientes_paginados(d, grupo)
+        return respuesta_json({'clientes': clientes, 'paginacion': pagina})
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/clusters', methods=['GET'])
+@cache_respuestas.memorizar
 def listar_clusters():
     try:
-        clusters = df_rfm['Cluster_RFM'].dropna().unique().tolist()
-        return jsonify({'clusters': clusters})
+        clusters = consultas.listar_clusters(repo.actual)
+        return respuesta_json({'clusters': clusters})
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/clientes_por_cluster/<cluster>', methods=['GET'])
+@cache_respuestas.memorizar
 def clientes_por_cluster(cluster):
     try:
+        d = repo.actual
         cluster_str = str(cluster).strip()
-        filtrado = df_rfm[df_rfm['Cluster_RFM'].astype(str) == cluster_str]
+        filtrado = consultas.grupo(d, 'cluster', cluster_str)
 
-        if filtrado.empty:
-            return jsonify({'clientes': []})
+        if filtrado is None:
+            return respuesta_json({'clientes': []})
 
-        clientes_cluster = filtrado['Cliente'].dropna().unique().tolist()
-        preview = filtrado.head(5).to_dict(orient='records')
+        clientes, pagina = _clientes_paginados(d, filtrado)
+        campos = _campos(d)
+        if campos is None and _formato() == 'records':
+            preview = filtrado['preview']
+        else:
+            preview = _registros(d, filtrado['filas_preview'], campos or list(d.df_rfm.columns))
 
-        return jsonify({
+        return respuesta_json({
             'cluster': cluster_str,
-            'clientes': clientes_cluster,
-            'preview': preview
+            'clientes': clientes,
+            'preview': preview,
+            'paginacion': pagina
         })
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/perfil_clusters', methods=['GET'])
+@cache_respuestas.memorizar
 def mostrar_perfil_clusters():
     try:
-        perfil_preview = df_perfil.head(5).to_dict(orient='records')
-        return jsonify({'perfil': perfil_preview})
+        perfil_preview = tabla_json(consultas.perfil_clusters(repo.actual), _formato())
+        return respuesta_json({'perfil': perfil_preview})
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/clientes_por_mes/<string:mes>', methods=['GET'])
+@cache_respuestas.memorizar
 def clientes_por_mes(mes):
     try:
-        mes_str = str(mes).strip().lower()
-        filtrado = df_rfm[df_rfm['mes_favorito'].astype(str).str.lower() == mes_str]
+        d = repo.actual
+        filas = consultas.filas_por_mes(d, mes)
 
-        if filtrado.empty:
-            return jsonify({'datos': []})
+        if filas is None:
+            return respuesta_json({'datos': []})
 
-        columnas = ['Cliente', 'recency', 'frequency']                                   # filtrar por mes favorito variables
-        columnas_existentes = [c for c in columnas if c in filtrado.columns]
-
-        resultado = filtrado[columnas_existentes].to_dict(orient='records')
-        return jsonify({'datos': resultado})
+        offset, limit = _paginacion()
+        resultado = _registros(d, filas[offset:offset + limit], _campos(d, consultas.columnas_por_mes(d)))
+        return respuesta_json({'datos': resultado, 'paginacion': _info_pagina(len(filas), offset, limit)})
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
 
 @app.route('/meses_favoritos', methods=['GET'])
+@cache_respuestas.memorizar
 def listar_meses_favoritos():
     try:
-        meses = df_rfm['mes_favorito'].dropna().unique().tolist()
-        return jsonify({'meses': meses})
+        meses = consultas.listar_meses_favoritos(repo.actual)
+        return respuesta_json({'meses': meses})
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+
+# ============================================================
+# === SECCIÓN 6: AGREGADOS ===================================
+# ============================================================
+# Resúmenes calculados en el servidor con un groupby sobre df_rfm:
+#   ?por=Departamento,Cluster_RFM          -> claves de agrupación
+#   ?metricas=recency:mean,monetary:sum    -> columna:función
+#   ?filtro=Cluster_RFM:2|3 (repetible)    -> columna:valor1|valor2
+# La respuesta queda en la caché por versión de datos y por query string.
+
+def _lista_param(nombre):
+    return [v.strip() for v in request.args.get(nombre, '').split(',') if v.strip()]
+
+
+def _pares(texto, nombre):
+    columna, separador, valor = texto.partition(':')
+    if not separador or not columna.strip() or not valor.strip():
+        raise ValueError(f"'{nombre}' debe tener la forma columna:valor ('{texto}')")
+    return columna.strip(), valor.strip()
+
+
+def _filtros():
+    """{columna: [valores]} de los parámetros ?filtro=columna:v1|v2."""
+    filtros = {}
+    for texto in request.args.getlist('filtro'):
+        columna, valores = _pares(texto, 'filtro')
+        filtros.setdefault(columna, []).extend(valores.split('|'))
+    return filtros
+
+
+@app.route('/agregados', methods=['GET'])
+@cache_respuestas.memorizar
+def agregados():
+    try:
+        por = _lista_param('por')
+        metricas = [_pares(m, 'metricas') for m in _lista_param('metricas')]
+        tabla = consultas.agregados(repo.actual, por, metricas, _filtros())
+        return respuesta_json({
+            'por': por,
+            'grupos': len(tabla),
+            'datos': tabla_json(tabla, _formato())
+        })
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return respuesta_json({'error': str(e)}, 500)
+
+
+# ============================================================
+# === SECCIÓN 6.1: EXPORTACIÓN MASIVA ========================
+# ============================================================
+# df_rfm completo (o filtrado) en una sola descarga por streaming, en
+# bloques de exportacion.TAMANO_BLOQUE filas:
+#   ?formato=csv (defecto) | ndjson | arrow
+#   ?departamento=META|BOYACA  ?cluster=2  ?mes=7   -> filtros (repetibles)
+#   ?filtro=Pago:Contado                            -> como en /agregados
+#   ?fields=Cliente,recency                         -> columnas a exportar
+# No pasa por la caché de respuestas: el cuerpo nunca se arma entero.
+
+FILTROS_EXPORTACION = {'departamento': 'Departamento', 'cluster': 'Cluster_RFM', 'mes': 'mes_favorito'}
+
+
+@app.route('/export', methods=['GET'])
+def exportar_clientes():
+    try:
+        d = repo.actual
+        formato = request.args.get('formato', 'csv')
+        filtros = _filtros()
+        for parametro, columna in FILTROS_EXPORTACION.items():
+            for valores in request.args.getlist(parametro):
+                filtros.setdefault(columna, []).extend(valores.split('|'))
+
+        filas = consultas.filas_filtradas(d, filtros)
+        df = d.df_rfm[_campos(d, list(d.df_rfm.columns))]
+        bloques = exportar(df, filas, formato)
+        # cabecera / esquema: los errores salen aquí, no a mitad del cuerpo
+        # (un NDJSON sin filas no produce bloques: cuerpo vacío, 200)
+        primero = next(bloques, b'')
+
+        mimetype, extension = FORMATOS_EXPORTACION[formato]
+        respuesta = Response(itertools.chain([primero], bloques), mimetype=mimetype)
+        respuesta.headers['Content-Disposition'] = f'attachment; filename="clientes_rfm.{extension}"'
+        respuesta.headers['X-Total-Filas'] = str(len(filas))
+        respuesta.headers['X-Version-Datos'] = d.version
+        return respuesta
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+
+@app.route('/admin/recargar', methods=['POST'])
+def admin_recargar():
+    token = os.environ.get('API_TOKEN_ADMIN')
+    if not token:
+        return respuesta_json({'error': 'Recarga por API deshabilitada (defina API_TOKEN_ADMIN).'}, 403)
+    if request.headers.get('X-Token-Admin') != token:
+        return respuesta_json({'error': 'Token de administración inválido.'}, 403)
+    try:
+        forzar = request.args.get('forzar') == '1'
+        recargado = repo.recargar(forzar=forzar)
+        return respuesta_json({'recargado': recargado, 'version': repo.actual.version})
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+
+# ============================================================
+# === SECCIÓN 7: IMAGEN DE CLUSTERS ==========================
+# ============================================================
+# descargar.png se sirve desde recursos.py: variantes redimensionadas y
+# en WebP generadas una vez por contenido, con ETag fuerte y soporte de
+# Range (descargas parciales y reanudables).
+#   /imagen_descargar?ancho=480&formato=webp|png  -> URL estable, caché corta;
+#       sin formato se elige WebP si el cliente lo acepta
+#   /recursos/<nombre versionado>                 -> URL inmutable, caché de un año
+# La respuesta de /imagen_descargar indica su URL versionada en Content-Location.
+
+recurso_clusters = Recurso('descargar.png')
+MAX_AGE_INMUTABLE = 365 * 24 * 3600
+
+
+def _respuesta_variante(variante, max_age, inmutable=False):
+    respuesta = Response(variante.datos, mimetype=variante.mimetype)
+    respuesta.set_etag(variante.etag)
+    respuesta.cache_control.public = True
+    respuesta.cache_control.max_age = max_age
+    if inmutable:
+        respuesta.cache_control.immutable = True
+    return respuesta.make_conditional(request, accept_ranges=True, complete_length=len(variante.datos))
 
 
 @app.route('/imagen_descargar')
 def imagen_descargar():
-    return app.send_static_file('descargar.png')
+    try:
+        try:
+            ancho = int(request.args['ancho']) if 'ancho' in request.args else None
+        except ValueError:
+            raise ValueError("'ancho' debe ser un entero") from None
+        formato = request.args.get('formato') or \
+            ('webp' if 'image/webp' in request.headers.get('Accept', '') else 'png')
+
+        variante = recurso_clusters.variante(ancho, formato)
+        respuesta = _respuesta_variante(variante, cache_respuestas.max_age)
+        respuesta.headers['Content-Location'] = f'/recursos/{variante.nombre}'
+        if 'formato' not in request.args:
+            respuesta.vary.add('Accept')
+        return respuesta
+    except FileNotFoundError:
+        return respuesta_json({'error': 'No se encontró la imagen de clusters.'}, 404)
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, 400)
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
+
+
+@app.route('/recursos/<string:nombre>')
+def recurso_versionado(nombre):
+    try:
+        variante = recurso_clusters.por_nombre(nombre)
+        if variante is None:
+            return respuesta_json({'error': f"Recurso no encontrado: '{nombre}'"}, 404)
+        return _respuesta_variante(variante, MAX_AGE_INMUTABLE, inmutable=True)
+    except FileNotFoundError:
+        return respuesta_json({'error': 'No se encontró la imagen de clusters.'}, 404)
+    except Exception as e:
+        return respuesta_json({'error': str(e)}, 500)
 
 
 # ============================================================
 # === EJECUCIÓN DE LA API ====================================
 # ============================================================
 
+def crear_app():
+    """Fábrica de la app para servidores WSGI (gunicorn 'api2:crear_app()').
+
+    Los datos y modelos ya quedan cargados al importar este módulo, de modo
+    que con preload el proceso maestro los carga una vez antes del fork.
+    """
+    return app
+
+
+arranque.informe('API lista', repo.actual.tiempos_carga)
+
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
+    # Servidor de desarrollo. En producción: python servidor.py
+    iniciar_recarga_automatica()
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', port=5001)
@@ -0,0 +1,72 @@
+import builtins
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# ============================================================
+# === PERFIL DE ARRANQUE =====================================
+# ============================================================
+# Con PERFIL_ARRANQUE=1 se mide cuánto cuesta cada importación de
+# primer nivel (incluidas sus dependencias) y cada fase de carga
+# marcada con `fase(...)`. api2.py y streamlit_app.py importan este
+# módulo antes que cualquier otro y llaman a informe() al quedar listos:
+#
+#   PERFIL_ARRANQUE=1 python api2.py
+#   PERFIL_ARRANQUE=1 python -m streamlit run streamlit_app.py
+#
+# Las importaciones diferidas (dentro de funciones) también quedan
+# registradas la primera vez que ocurren. Sin la variable no se
+# instala nada y fase() solo toma el tiempo.
+
+PERFIL_ARRANQUE = os.environ.get('PERFIL_ARRANQUE') == '1'
+
+INICIO = time.perf_counter()
+tiempos = {}           # 'import x' / nombre de fase -> segundos
+
+_importar_original = builtins.__import__
+_hilo = threading.local()       # profundidad de importación: solo se mide el primer nivel
+
+
+def _importar_medido(name, globals=None, locals=None, fromlist=(), level=0):
+    # Misma firma que builtins.__import__ (importlib la llama con palabras clave)
+    if getattr(_hilo, 'profundidad', 0) or level or name in sys.modules:
+        return _importar_original(name, globals, locals, fromlist, level)
+    _hilo.profundidad = 1
+    inicio = time.perf_counter()
+    try:
+        return _importar_original(name, globals, locals, fromlist, level)
+    finally:
+        _hilo.profundidad = 0
+        clave = f'import {name}'
+        tiempos[clave] = tiempos.get(clave, 0.0) + time.perf_counter() - inicio
+
+
+if PERFIL_ARRANQUE:
+    builtins.__import__ = _importar_medido
+
+
+@contextmanager
+def fase(nombre):
+    """Registra en `tiempos` la duración del bloque."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tiempos[nombre] = time.perf_counter() - inicio
+
+
+MINIMO_INFORME = 0.001    # segundos: las entradas menores no se listan
+
+
+def informe(titulo, detalle_carga=None):
+    """Imprime las fases medidas (y las de la carga de datos) con PERFIL_ARRANQUE=1."""
+    if not PERFIL_ARRANQUE:
+        return
+    print(f"⏱️ Perfil de arranque — {titulo} ({time.perf_counter() - INICIO:.3f} s hasta aquí)")
+    for nombre, segundos in sorted(tiempos.items(), key=lambda par: -par[1]):
+        if segundos >= MINIMO_INFORME:
+            print(f"   {nombre:<40} {segundos:8.3f} s")
+    for nombre, segundos in (detalle_carga or {}).items():
+        print(f"   carga: {nombre:<33} {segundos:8.3f} s")
@@ -0,0 +1,156 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks import informe
+from benchmarks.datos_sinteticos import RAIZ
+
+# ============================================================
+# === PRUEBA DE CARGA CONCURRENTE ============================
+# ============================================================
+# N hilos hacen peticiones HTTP (una requests.Session por hilo) contra
+# una API en marcha durante un tiempo fijo, mezclando endpoints. Reporta
+# p50/p95/p99, throughput y errores, en total y por endpoint.
+#
+#   python -m benchmarks.carga --url http://127.0.0.1:5001 --concurrencia 16 --duracion 20
+#
+# Con --datos se arranca servidor.py sobre ese directorio (por ejemplo
+# benchmarks/datos/100000, generado por benchmarks.micro) y se detiene al final:
+#
+#   python -m benchmarks.carga --datos benchmarks/datos/100000 --workers 4 --hilos 4
+
+PUERTO_POR_DEFECTO = 5099
+
+
+def _rutas(url):
+    """Mezcla de peticiones (nombre, método, ruta, cuerpo) con datos reales de la API."""
+    sesion = requests.Session()
+    clientes = sesion.get(f'{url}/clientes', params={'limit': 200}, timeout=30).json()['clientes']
+    clusters = sesion.get(f'{url}/clusters', timeout=30).json()['clusters']
+    departamentos = sesion.get(f'{url}/departamentos', timeout=30).json()['departamentos']
+
+    casos = []
+    for nombre in clientes[:50]:
+        casos.append(('cliente', 'GET', f'/cliente/{nombre}', None))
+        casos.append(('buscar_clientes', 'GET', f'/buscar_clientes?q={nombre[:6]}', None))
+    for cluster in clusters:
+        casos.append(('clientes_por_cluster', 'GET', f'/clientes_por_cluster/{cluster}?limit=100', None))
+    for departamento in departamentos:
+        casos.append(('clientes_por_departamento', 'GET', f'/clientes_por_departamento/{departamento}?limit=100', None))
+    for horizonte in (6, 12, 24):
+        casos.append(('forecast', 'GET', f'/forecast?horizonte={horizonte}', None))
+    for x in range(30, 40):
+        casos.append(('predict', 'POST', '/predict', {'x': x}))
+    casos.append(('agregados', 'GET', '/agregados?por=Cluster_RFM&metricas=recency:mean', None))
+    return casos
+
+
+def ejecutar(url, concurrencia, duracion):
+    casos = _rutas(url)
+    fin = time.perf_counter() + duracion
+    lock = threading.Lock()
+    latencias = defaultdict(list)
+    errores = defaultdict(int)
+
+    def trabajador(semilla):
+        rng = np.random.default_rng(semilla)
+        sesion = requests.Session()
+        propias, fallas = defaultdict(list), defaultdict(int)
+        while time.perf_counter() < fin:
+            nombre, metodo, ruta, cuerpo = casos[rng.integers(0, len(casos))]
+            inicio = time.perf_counter()
+            try:
+                respuesta = sesion.request(metodo, f'{url}{ruta}', json=cuerpo, timeout=30)
+                if respuesta.status_code >= 400:
+                    fallas[nombre] += 1
+            except requests.RequestException:
+                fallas[nombre] += 1
+            propias[nombre].append(time.perf_counter() - inicio)
+        with lock:
+            for nombre, valores in propias.items():
+                latencias[nombre].extend(valores)
+            for nombre, n in fallas.items():
+                errores[nombre] += n
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        list(ejecutor.map(trabajador, range(concurrencia)))
+    transcurrido = time.perf_counter() - inicio
+
+    todas = [v for valores in latencias.values() for v in valores]
+    return {
+        'duracion_s': round(transcurrido, 3),
+        'peticiones': len(todas),
+        'throughput_rps': round(len(todas) / transcurrido, 2),
+        'errores': sum(errores.values()),
+        'total': informe.resumen(todas),
+        'por_endpoint': {nombre: {**informe.resumen(valores), 'errores': errores[nombre]}
+                         for nombre, valores in sorted(latencias.items())},
+    }
+
+
+def _arrancar_servidor(datos, puerto, workers, hilos):
+    entorno = {**os.environ, 'PYTHONPATH': os.pathsep.join([RAIZ, os.environ.get('PYTHONPATH', '')]),
+               'API_RECARGA_SEGUNDOS': '0'}
+    comando = [sys.executable, os.path.join(RAIZ, 'servidor.py'), '--puerto', str(puerto),
+               '--workers', str(workers), '--hilos', str(hilos)]
+    proceso = subprocess.Popen(comando, cwd=datos, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{puerto}'
+    limite = time.time() + 600
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("El servidor terminó antes de quedar listo")
+        try:
+            requests.get(url, timeout=1)
+            return proceso, url
+        except requests.RequestException:
+            time.sleep(0.5)
+    proceso.terminate()
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente contra la API.")
+    parser.add_argument('--url', default=None, help="API ya en marcha (p. ej. http://127.0.0.1:5001)")
+    parser.add_argument('--datos', default=None, help="directorio de datos para arrancar servidor.py")
+    parser.add_argument('--puerto', type=int, default=PUERTO_POR_DEFECTO)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--duracion', type=float, default=15)
+    parser.add_argument('--salida', default=None, help="archivo JSON de resultados")
+    args = parser.parse_args()
+
+    if (args.url is None) == (args.datos is None):
+        parser.error("indique --url o --datos (uno de los dos)")
+
+    proceso, url = (None, args.url.rstrip('/')) if args.url else \
+        _arrancar_servidor(args.datos, args.puerto, args.workers, args.hilos)
+    try:
+        resultados = ejecutar(url, args.concurrencia, args.duracion)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    total = resultados['total']
+    print(f"📊 {resultados['peticiones']} peticiones en {resultados['duracion_s']:.1f} s "
+          f"({resultados['throughput_rps']:.1f} req/s, {resultados['errores']} errores)")
+    print(f"   p50 {total['p50_ms']:.2f} ms   p95 {total['p95_ms']:.2f} ms   p99 {total['p99_ms']:.2f} ms")
+
+    parametros = {'url': args.url, 'datos': args.datos, 'workers': args.workers, 'hilos': args.hilos,
+                  'concurrencia': args.concurrencia, 'duracion': args.duracion}
+    print(f"✅ Resultados en '{informe.guardar('carga', resultados, parametros, args.salida)}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+
+# ============================================================
+# === COMPARACIÓN DE CORRIDAS Y CONTROL DE REGRESIONES =======
+# ============================================================
+# Compara dos archivos de resultados del mismo tipo (micro o carga) y
+# termina con código 1 si alguna medición empeoró más que la tolerancia:
+#
+#   python -m benchmarks.comparar base.json nuevo.json --metrica p95_ms --tolerancia 0.15
+
+
+def _mediciones(datos):
+    """{(grupo, caso): estadísticas} de un archivo de resultados."""
+    resultados = datos['resultados']
+    if datos['tipo'] == 'micro':
+        return {(filas, caso): stats
+                for filas, tamano in resultados.items()
+                for caso, stats in tamano.get('casos', {}).items()}     # sin 'casos': el tamaño falló
+    return {('carga', caso): stats for caso, stats in resultados['por_endpoint'].items()} | \
+        {('carga', 'total'): resultados['total']}
+
+
+def comparar(base, nuevo, metrica, tolerancia):
+    """Filas (grupo, caso, base, nuevo, cociente) y las que superan la tolerancia."""
+    if base['tipo'] != nuevo['tipo']:
+        raise ValueError(f"No se pueden comparar resultados '{base['tipo']}' y '{nuevo['tipo']}'")
+    antes, despues = _mediciones(base), _mediciones(nuevo)
+    filas, regresiones = [], []
+    for clave in sorted(antes.keys() & despues.keys()):
+        a, b = antes[clave].get(metrica), despues[clave].get(metrica)
+        if not a or b is None:
+            continue
+        fila = (*clave, a, b, b / a)
+        filas.append(fila)
+        if b / a > 1 + tolerancia:
+            regresiones.append(fila)
+    return filas, regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos corridas de benchmarks.")
+    parser.add_argument('base')
+    parser.add_argument('nuevo')
+    parser.add_argument('--metrica', default='p50_ms')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help="empeoramiento relativo permitido (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding='utf-8') as f:
+        nuevo = json.load(f)
+
+    try:
+        filas, regresiones = comparar(base, nuevo, args.metrica, args.tolerancia)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    print(f"{'grupo':>10}  {'caso':<30} {'base':>12} {'nuevo':>12} {'cambio':>8}")
+    for grupo, caso, a, b, cociente in filas:
+        marca = ' ❌' if cociente > 1 + args.tolerancia else ''
+        print(f"{grupo:>10}  {caso:<30} {a:12.3f} {b:12.3f} {cociente - 1:+8.1%}{marca}")
+
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresiones en {args.metrica} (tolerancia {args.tolerancia:.0%})")
+        sys.exit(1)
+    print(f"✅ Sin regresiones en {args.metrica} (tolerancia {args.tolerancia:.0%})")
+
+
+if __name__ == '__main__':
+    main()
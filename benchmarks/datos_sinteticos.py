@@ -0,0 +1,167 @@
+import argparse
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# === GENERADOR DE DATOS SINTÉTICOS PARA BENCHMARKS ==========
+# ============================================================
+# Escribe en un directorio los mismos archivos que lee la API, con la
+# forma de los reales y el número de filas que se pida:
+#
+#   resultado_rfm.parquet          clientes RFM (una fila por cliente)
+#   perfil_clusters_rfm.parquet    promedio de las variables por cluster
+#   transacciones/ventas.parquet   transacciones (forma de MachineLearning.xlsx)
+#   MachineLearning.joblib         {'modelo', 'm', 'b', 'data'} sobre la serie mensual
+#   modelo_cluster_rfm.joblib      copia del modelo de clusters del repositorio
+#
+#   python -m benchmarks.datos_sinteticos --filas 100000 --destino benchmarks/datos/100000
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEPARTAMENTOS = ['VALLE DEL CAUCA', 'BOYACA', 'BOGOTA DC', 'ANTIOQUIA', 'META', 'SANTANDER',
+                 'CUNDINAMARCA', 'CAUCA', 'HUILA', 'TOLIMA', 'NARIÑO', 'CALDAS', 'RISARALDA',
+                 'QUINDIO', 'ATLANTICO', 'BOLIVAR', 'CORDOBA', 'CESAR', 'ARAUCA', 'CASANARE']
+PAGOS = ['60 Días', '30 Días', '90 Días', 'Contado']
+TIPOS = ['S.A.S.', 'Persona Jurídica', 'LTDA.', 'S.A.', 'ESAL', 'SPA']
+COMERCIOS = ['Al Por Mayor', 'Al Por Menor', 'Elaboración', 'Explotación']
+MERCADOS = ["['Famacéuticos', 'Cosméticos', 'Medicinales']", "['Agropecuarios', 'Animales']",
+            "['Químicos', 'Plásticos', 'Cauchos', 'Agropecuarios']", "['Agrícolas']", "['Alimentos']"]
+PALABRAS = ['AGRO', 'INSUMOS', 'VETERINARIA', 'DISTRIBUCIONES', 'ALMACEN', 'GRANJA', 'CAMPO',
+            'DROGUERIA', 'COMERCIALIZADORA', 'GANADERO', 'AGROPECUARIA', 'SAN', 'JOSÉ', 'EL',
+            'NORTE', 'LLANO', 'COSTA', 'ANDINA', 'CAMPESINA', 'LA', 'ESPERANZA']
+
+FECHA_REFERENCIA = pd.Timestamp('2025-07-31')
+MESES_HISTORIA = 31
+
+
+def _elegir(rng, valores, filas):
+    return np.asarray(valores, dtype=object)[rng.integers(0, len(valores), filas)]
+
+
+def _ciudades(departamentos):
+    return np.char.add(departamentos.astype(str), ' - CIUDAD').astype(object)
+
+
+def nombres_clientes(rng, filas):
+    """Nombres únicos con palabras repetidas (útiles para la búsqueda por prefijos)."""
+    a, b = _elegir(rng, PALABRAS, filas), _elegir(rng, PALABRAS, filas)
+    sufijo = _elegir(rng, ['SAS', 'LTDA', 'S.A.', ''], filas)
+    return [f'{x} {y} {i:07d} {s}'.strip() for i, (x, y, s) in enumerate(zip(a, b, sufijo))]
+
+
+def generar_rfm(filas, modelo_cluster=None, semilla=0):
+    """DataFrame con las columnas de resultado_rfm y `filas` clientes."""
+    rng = np.random.default_rng(semilla)
+    recency = rng.integers(0, 900, filas)
+    frequency = rng.poisson(20, filas) + 1
+    cantidades = frequency * rng.integers(5, 60, filas)
+    departamentos = _elegir(rng, DEPARTAMENTOS, filas)
+
+    df = pd.DataFrame({
+        'Cliente': nombres_clientes(rng, filas),
+        'ultima_compra': FECHA_REFERENCIA - pd.to_timedelta(recency, unit='D'),
+        'frequency': frequency,
+        'monetary': np.round(frequency * rng.lognormal(13.5, 0.8, filas), 2),
+        'mes_favorito': rng.integers(1, 13, filas),
+        'semana_favorita': rng.integers(1, 5, filas),
+        'total_cantidades': cantidades,
+        'total_devoluciones': rng.binomial(cantidades, 0.02),
+        'total_bonificaciones': rng.binomial(cantidades, 0.08),
+        'pct_bonif_promedio': np.round(rng.uniform(0, 20, filas), 2),
+        'vlr_unitario_promedio': np.round(rng.uniform(8000, 35000, filas), 2),
+        'antiguedad': rng.integers(0, 65, filas),
+        'recency': recency,
+        'meses_sin_comprar': recency / 30.44,
+        'Departamento': departamentos,
+        'Ciudad': _ciudades(departamentos),
+        'Pago': _elegir(rng, PAGOS, filas),
+        'Tipo': _elegir(rng, TIPOS, filas),
+        'Comercio': _elegir(rng, COMERCIOS, filas),
+        'Mercado': _elegir(rng, MERCADOS, filas),
+    })
+
+    if modelo_cluster is not None:
+        from segmentacion import asignar_clusters, matriz_variables
+        df['Cluster_RFM'] = asignar_clusters(matriz_variables(df, modelo_cluster['variables']), modelo_cluster)
+    else:
+        df['Cluster_RFM'] = rng.integers(0, 5, filas)
+    return df
+
+
+def generar_transacciones(filas, clientes, semilla=0):
+    """Transacciones con tendencia mensual, con la forma de MachineLearning.xlsx."""
+    rng = np.random.default_rng(semilla + 1)
+    inicio = FECHA_REFERENCIA - pd.DateOffset(months=MESES_HISTORIA - 1) - pd.offsets.MonthBegin(1)
+    dias = (FECHA_REFERENCIA - inicio).days + 1
+    # Más transacciones hacia el final del periodo: la serie mensual tiene tendencia
+    desplazamiento = np.floor(dias * np.sqrt(rng.uniform(0, 1, filas))).astype('int64')
+    cantidad = rng.integers(1, 30, filas)
+    vlr_unitario = np.round(rng.uniform(8000, 35000, filas), 0)
+    bonificacion = rng.binomial(cantidad, 0.1)
+    departamentos = _elegir(rng, DEPARTAMENTOS, filas)
+    return pd.DataFrame({
+        'Cliente': np.asarray(clientes, dtype=object)[rng.integers(0, len(clientes), filas)],
+        'Fecha': inicio + pd.to_timedelta(desplazamiento, unit='D'),
+        'Devolucion': rng.binomial(1, 0.02, filas),
+        'Bonificacion': bonificacion,
+        'Cantidad': cantidad,
+        'Vlr Unitario': vlr_unitario,
+        'Vlr Total': cantidad * vlr_unitario,
+        'Venta': cantidad + bonificacion,
+        '% de Bonif': np.round(100 * bonificacion / (cantidad + bonificacion), 2),
+        'Pago': _elegir(rng, PAGOS, filas),
+        'Ciudad': _ciudades(departamentos),
+        'Departamento': departamentos,
+    })
+
+
+def modelo_lineal(transacciones):
+    """{'modelo', 'm', 'b', 'data'} como en MachineLearning.joblib."""
+    from sklearn.linear_model import LinearRegression
+
+    from preprocesamiento import serie_mensual
+
+    data = serie_mensual(transacciones)
+    data['Tiempo'] = np.arange(len(data))
+    modelo = LinearRegression().fit(data[['Tiempo']], data['Vlr Total'])
+    return {'modelo': modelo, 'm': float(modelo.coef_[0]), 'b': float(modelo.intercept_), 'data': data}
+
+
+def generar(destino, filas, semilla=0):
+    """Escribe el conjunto completo de archivos en `destino`."""
+    from segmentacion import perfil_clusters
+
+    os.makedirs(os.path.join(destino, 'transacciones'), exist_ok=True)
+    ruta_cluster = os.path.join(RAIZ, 'modelo_cluster_rfm.joblib')
+    modelo_cluster = None
+    if os.path.exists(ruta_cluster):
+        shutil.copy(ruta_cluster, os.path.join(destino, 'modelo_cluster_rfm.joblib'))
+        modelo_cluster = joblib.load(ruta_cluster)
+
+    rfm = generar_rfm(filas, modelo_cluster, semilla)
+    rfm.to_parquet(os.path.join(destino, 'resultado_rfm.parquet'), index=False)
+    variables = modelo_cluster['variables'] if modelo_cluster else ['recency', 'frequency', 'monetary']
+    perfil_clusters(rfm, variables).to_parquet(os.path.join(destino, 'perfil_clusters_rfm.parquet'), index=False)
+
+    transacciones = generar_transacciones(filas, rfm['Cliente'].to_numpy(), semilla)
+    transacciones.to_parquet(os.path.join(destino, 'transacciones', 'ventas.parquet'), index=False)
+    joblib.dump(modelo_lineal(transacciones), os.path.join(destino, 'MachineLearning.joblib'))
+    return destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos con la forma de los de la API.")
+    parser.add_argument('--filas', type=int, default=100_000)
+    parser.add_argument('--destino', required=True)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+    generar(args.destino, args.filas, args.semilla)
+    print(f"✅ Datos sintéticos ({args.filas} filas) en '{args.destino}'")
+
+
+if __name__ == '__main__':
+    main()
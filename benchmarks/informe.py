@@ -0,0 +1,64 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+# ============================================================
+# === RESULTADOS DE BENCHMARKS ===============================
+# ============================================================
+# Resumen de latencias en milisegundos y escritura de los resultados
+# como JSON, con lo necesario para comparar corridas (commit, Python,
+# plataforma y parámetros). benchmarks/comparar.py lee estos archivos.
+
+CARPETA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+
+def resumen(latencias):
+    """Estadísticas en ms de una lista de latencias en segundos."""
+    ms = np.asarray(latencias, dtype=float) * 1000
+    if ms.size == 0:
+        return {'n': 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'n': int(ms.size),
+        'media_ms': round(float(ms.mean()), 4),
+        'min_ms': round(float(ms.min()), 4),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'max_ms': round(float(ms.max()), 4),
+    }
+
+
+def _commit():
+    try:
+        salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(CARPETA_RESULTADOS), timeout=10)
+        return salida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadatos(parametros):
+    return {
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parametros': parametros,
+    }
+
+
+def guardar(tipo, resultados, parametros, ruta=None):
+    """Escribe {'tipo', metadatos..., 'resultados'} y devuelve la ruta del archivo."""
+    if ruta is None:
+        marca = datetime.now().strftime('%Y%m%d-%H%M%S')
+        ruta = os.path.join(CARPETA_RESULTADOS, f'{marca}-{tipo}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'tipo': tipo, **metadatos(parametros), 'resultados': resultados}, f, indent=2, ensure_ascii=False)
+    return ruta
@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks import informe
+from benchmarks.datos_sinteticos import RAIZ, generar
+
+# ============================================================
+# === MICRO-BENCHMARKS DE LOS ENDPOINTS ======================
+# ============================================================
+# Para cada tamaño se generan (o reutilizan) datos sintéticos en
+# benchmarks/datos/<filas> y se mide, en un proceso aparte con ese
+# directorio como carpeta de trabajo:
+#
+#   - la carga de la instantánea (importar api2: tablas, joblib, índices)
+#   - cada endpoint a través del test client de Flask, con la caché de
+#     respuestas desactivada para medir el trabajo real de la consulta
+#   - el preprocesamiento del pronóstico (serie mensual + outliers IQR)
+#
+#   python -m benchmarks.micro
+#   python -m benchmarks.micro --tamanos 1000 100000 1000000 --repeticiones 200
+#
+# El resultado queda en benchmarks/resultados/<fecha>-micro.json y se
+# reescribe después de cada tamaño. Un tamaño que falla (p. ej. el proceso
+# hijo muere por memoria) queda como {'error': ...} y se sigue con el resto.
+
+TAMANOS = [1_000, 100_000]     # 1_000_000 solo a pedido (--tamanos)
+CARPETA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos')
+
+
+def _casos(api2, rng):
+    """Diccionario nombre -> función sin argumentos que hace una petición."""
+    cliente = api2.app.test_client()
+    d = api2.repo.actual
+    nombres = d.df_rfm['Cliente'].sample(min(100, len(d.df_rfm)), random_state=0).tolist()
+    departamentos = d.indices['valores']['departamento']
+    clusters = d.indices['valores']['cluster']
+    variables = d.modelo_cluster['variables'] if d.modelo_cluster else []
+    registros = d.df_rfm[variables].head(100).astype(float).to_dict('records')
+
+    def al_azar(valores):
+        return valores[rng.integers(0, len(valores))]
+
+    return {
+        'cliente': lambda: cliente.get(f'/cliente/{al_azar(nombres)}'),
+        'clientes_por_cluster': lambda: cliente.get(f'/clientes_por_cluster/{al_azar(clusters)}?limit=100'),
+        'clientes_por_departamento': lambda: cliente.get(f'/clientes_por_departamento/{al_azar(departamentos)}?limit=100'),
+        'clientes_por_mes': lambda: cliente.get(f'/clientes_por_mes/{rng.integers(1, 13)}?limit=100'),
+        'buscar_clientes': lambda: cliente.get(f'/buscar_clientes?q={al_azar(nombres)[:6]}'),
+        'agregados': lambda: cliente.get('/agregados?por=Departamento,Cluster_RFM&metricas=recency:mean,monetary:sum'),
+        'predict': lambda: cliente.post('/predict', json={'x': float(rng.integers(0, 60))}),
+        'predict_lote': lambda: cliente.post('/predict', json={'inicio': 0, 'fin': 1000}),
+        'forecast': lambda: cliente.get(f'/forecast?horizonte={rng.integers(1, 37)}'),
+        'assign_cluster': lambda: cliente.post('/assign_cluster', json={'registros': registros}),
+        'export_cluster_ndjson': lambda: cliente.get(f'/export?formato=ndjson&cluster={al_azar(clusters)}'),
+    }
+
+
+def _medir(funcion, repeticiones, calentamiento):
+    for _ in range(calentamiento):
+        funcion()
+    latencias, errores = [], 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = funcion()
+        latencias.append(time.perf_counter() - inicio)
+        if getattr(respuesta, 'status_code', 200) >= 400:
+            errores += 1
+    return {**informe.resumen(latencias), 'errores': errores}
+
+
+def medir_directorio(repeticiones, calentamiento):
+    """Corre dentro del directorio de datos (proceso hijo) y devuelve los resultados."""
+    import pandas as pd
+
+    inicio = time.perf_counter()
+    import api2
+    carga_s = time.perf_counter() - inicio
+
+    api2.cache_respuestas.max_entradas = 0          # sin memorización: se mide la consulta
+    rng = np.random.default_rng(0)
+    casos = {nombre: _medir(funcion, repeticiones, calentamiento)
+             for nombre, funcion in _casos(api2, rng).items()}
+
+    from preprocesamiento import reemplazar_outliers_iqr, serie_mensual
+    transacciones = pd.read_parquet(os.path.join('transacciones', 'ventas.parquet'), columns=['Fecha', 'Vlr Total'])
+    casos['preprocesamiento_pronostico'] = _medir(
+        lambda: reemplazar_outliers_iqr(serie_mensual(transacciones)['Vlr Total']),
+        max(1, repeticiones // 10), 1)
+
+    return {
+        'filas': len(api2.repo.actual.df_rfm),
+        'carga_s': round(carga_s, 4),
+        'tiempos_carga_s': {fase: round(s, 4) for fase, s in api2.repo.actual.tiempos_carga.items()},
+        'casos': casos,
+    }
+
+
+def preparar_datos(filas, regenerar=False):
+    destino = os.path.join(CARPETA_DATOS, str(filas))
+    if regenerar or not os.path.exists(os.path.join(destino, 'resultado_rfm.parquet')):
+        print(f"⏳ Generando datos sintéticos de {filas} filas...")
+        generar(destino, filas)
+    return destino
+
+
+def _en_proceso_aparte(directorio, repeticiones, calentamiento):
+    entorno = {**os.environ, 'PYTHONPATH': os.pathsep.join([RAIZ, os.environ.get('PYTHONPATH', '')]),
+               'API_RECARGA_SEGUNDOS': '0'}
+    comando = [sys.executable, '-m', 'benchmarks.micro', '--hijo',
+               '--repeticiones', str(repeticiones), '--calentamiento', str(calentamiento)]
+    salida = subprocess.run(comando, cwd=directorio, env=entorno, capture_output=True, text=True)
+    if salida.returncode != 0:
+        raise RuntimeError(f"Falló el benchmark en '{directorio}' (código {salida.returncode}):\n"
+                           f"{salida.stderr[-2000:]}")
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de los endpoints de la API.")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS)
+    parser.add_argument('--repeticiones', type=int, default=100)
+    parser.add_argument('--calentamiento', type=int, default=5)
+    parser.add_argument('--regenerar', action='store_true', help="volver a generar los datos sintéticos")
+    parser.add_argument('--salida', default=None, help="archivo JSON de resultados")
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        print(json.dumps(medir_directorio(args.repeticiones, args.calentamiento)))
+        return
+
+    parametros = {'tamanos': args.tamanos, 'repeticiones': args.repeticiones, 'calentamiento': args.calentamiento}
+    resultados, fallidos = {}, []
+    ruta = args.salida
+    for filas in args.tamanos:
+        try:
+            directorio = preparar_datos(filas, args.regenerar)
+            resultados[str(filas)] = _en_proceso_aparte(directorio, args.repeticiones, args.calentamiento)
+        except Exception as e:
+            resultados[str(filas)] = {'error': str(e)}
+            fallidos.append(filas)
+            print(f"❌ {filas} filas: {e}")
+        else:
+            print(f"📏 {filas} filas (carga {resultados[str(filas)]['carga_s']:.2f} s)")
+            for caso, stats in resultados[str(filas)]['casos'].items():
+                print(f"   {caso:<30} p50 {stats['p50_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms   "
+                      f"p99 {stats['p99_ms']:9.3f} ms")
+        # Se guarda tras cada tamaño: un fallo posterior no pierde lo ya medido
+        ruta = informe.guardar('micro', resultados, parametros, ruta)
+
+    print(f"✅ Resultados en '{ruta}'")
+    if fallidos:
+        sys.exit(f"❌ Fallaron los tamaños {', '.join(map(str, fallidos))}")
+
+
+if __name__ == '__main__':
+    main()
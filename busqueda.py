@@ -0,0 +1,255 @@
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+# ============================================================
+# === BÚSQUEDA DE CLIENTES POR NOMBRE ========================
+# ============================================================
+# Índice que se construye una vez por instantánea (ver repositorio.py)
+# sobre los nombres normalizados: sin tildes, en minúsculas y con los
+# espacios colapsados. En la carga inicial la construcción se difiere
+# hasta la primera búsqueda (o hasta preparar(), que servidor.py llama
+# antes del fork); las recargas en caliente la hacen antes de publicar.
+#
+#   - Prefijos: posiciones de nombres completos y de nombres a partir de
+#     cada palabra, ordenadas por esa clave. Las claves con un mismo
+#     prefijo quedan contiguas, así que un par de bisect recorre el
+#     subárbol del trie equivalente sin guardar un diccionario por nodo
+#     (ni una copia de cada sufijo: la clave se arma al comparar).
+#   - Trigramas: listas de posiciones por trigrama (arreglos numpy en
+#     formato CSR, trigramas codificados como enteros) para tolerar errores
+#     de escritura y coincidencias en medio del nombre (similitud de
+#     Jaccard entre conjuntos de trigramas).
+#
+# Orden de los resultados: exacta, prefijo del nombre, prefijo de una
+# palabra y por último los similares por trigramas.
+
+SIMILITUD_MINIMA = 0.3
+MAX_CANDIDATOS_PREFIJO = 200
+MAX_CANDIDATOS_SIMILARES = 10_000
+NOMBRES_POR_LOTE = 50_000
+
+
+def plegar(texto):
+    """Minúsculas, sin tildes ni diacríticos y con espacios simples."""
+    texto = str(texto)
+    if not texto.isascii():
+        descompuesto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def trigramas(texto):
+    """Trigramas del texto plegado, con relleno para marcar inicio y fin."""
+    relleno = f'  {texto} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _claves_trigramas(plegados, letra_de, n_total=None, desplazamiento=0):
+    """Trigramas de cada texto como claves enteras código * n_total + posición.
+
+    Cada carácter se traduce con `letra_de` (código Unicode -> número de
+    letra, 0 = fuera del alfabeto) y el código del trigrama es
+    (a * L + b) * L + c. Devuelve las claves ordenadas y sin repetir dentro
+    de cada texto; la posición es desplazamiento + índice en `plegados`.
+    """
+    n_total = n_total or max(len(plegados), 1)
+    rellenos = [f'  {p} ' for p in plegados]
+    largos = np.fromiter((len(r) for r in rellenos), dtype=np.int64, count=len(rellenos))
+    texto = np.frombuffer(''.join(rellenos).encode('utf-32-le'), dtype=np.uint32)
+    letras = np.where(texto < len(letra_de), letra_de[np.minimum(texto, len(letra_de) - 1)], 0)
+
+    # Un trigrama empieza en cada posición salvo las dos últimas de cada texto
+    validas = np.ones(len(texto), dtype=bool)
+    fines = np.cumsum(largos)
+    validas[fines - 1] = False
+    validas[fines - 2] = False
+    inicios = np.flatnonzero(validas)
+
+    base = int(letra_de.max(initial=0)) + 1
+    claves = (letras[inicios] * base + letras[inicios + 1]) * base + letras[inicios + 2]
+    claves *= n_total
+    claves += np.repeat(np.arange(desplazamiento, desplazamiento + len(plegados), dtype=np.int64), largos - 2)
+    claves.sort()
+    return claves[np.r_[True, claves[1:] != claves[:-1]]] if len(claves) else claves
+
+
+def _inicios_palabra(plegados):
+    """(posición del nombre, desplazamiento) de cada palabra después de la primera."""
+    largos = np.fromiter((len(p) + 1 for p in plegados), dtype=np.int64, count=len(plegados))
+    texto = np.frombuffer('\n'.join(plegados).encode('utf-32-le'), dtype=np.uint32)
+    espacios = np.flatnonzero(texto == ord(' '))
+    comienzos = np.cumsum(largos) - largos
+    duenos = np.searchsorted(comienzos, espacios, side='right') - 1
+    return duenos.astype(np.int32), (espacios - comienzos[duenos] + 1).astype(np.int32), texto[espacios + 1]
+
+
+def _rango_prefijo(clave, n, prefijo):
+    """[inicio, fin) de las posiciones 0..n-1, ordenadas por clave(j), que empiezan por prefijo."""
+    posiciones = range(n)
+    return (bisect_left(posiciones, prefijo, key=clave),
+            bisect_right(posiciones, prefijo + '\uffff', key=clave))
+
+
+class IndiceNombres:
+    """Índice de prefijos y trigramas sobre una lista de nombres."""
+
+    def __init__(self, nombres):
+        self.nombres = list(nombres)
+        self._listo = False
+        self._lock = threading.Lock()
+
+    def preparar(self):
+        """Construye las estructuras de búsqueda si aún no existen."""
+        if self._listo:
+            return self
+        with self._lock:
+            if not self._listo:
+                self._construir()
+                self._listo = True
+        return self
+
+    def _construir(self):
+        self._plegados = plegados = [plegar(n) for n in self.nombres]
+        n = len(plegados)
+
+        # Prefijos: solo arreglos de posiciones ordenados por la clave; la
+        # clave (el nombre, o el nombre desde una palabra) se arma al comparar.
+        self._ids_nombre = np.array(sorted(range(n), key=plegados.__getitem__), dtype=np.int32)
+
+        duenos, desde, primeras = _inicios_palabra(plegados)
+        orden = []
+        for letra in np.unique(primeras):       # por letra inicial, para no tener todas las claves a la vez
+            grupo = np.flatnonzero(primeras == letra).tolist()
+            orden.extend(sorted(grupo, key=lambda j: plegados[duenos[j]][desde[j]:]))
+        orden = np.array(orden, dtype=np.int64)
+        self._ids_palabra, self._desde_palabra = duenos[orden], desde[orden]
+        del duenos, desde, primeras, orden
+
+        # Listas de posiciones por trigrama en formato CSR: las claves
+        # código * n + posición de todos los lotes se ordenan en un solo
+        # arreglo; _codigos guarda los códigos distintos, _cortes dónde
+        # empieza la lista de cada uno en _duenos (en orden de posición).
+        alfabeto = np.unique(np.frombuffer((''.join(plegados) + ' ').encode('utf-32-le'), dtype=np.uint32))
+        self._letra_de = np.zeros(int(alfabeto[-1]) + 1, dtype=np.int64)
+        self._letra_de[alfabeto] = np.arange(1, len(alfabeto) + 1)
+
+        claves = np.empty(sum(len(p) + 1 for p in plegados), dtype=np.int64)
+        usadas = 0
+        for inicio in range(0, n, NOMBRES_POR_LOTE):
+            lote = _claves_trigramas(plegados[inicio:inicio + NOMBRES_POR_LOTE], self._letra_de, n, inicio)
+            claves[usadas:usadas + len(lote)] = lote
+            usadas += len(lote)
+        claves = claves[:usadas]
+        claves.sort()
+
+        self._duenos = np.empty(len(claves), dtype=np.int32)
+        np.remainder(claves, max(n, 1), out=self._duenos, casting='unsafe')
+        claves //= max(n, 1)
+        primeros = np.flatnonzero(np.r_[True, claves[1:] != claves[:-1]]) if len(claves) else claves
+        self._codigos = claves[primeros]
+        self._cortes = np.append(primeros, len(claves))
+        self._n_trigramas = np.bincount(self._duenos, minlength=n).astype(np.int32)
+        del claves
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def _clave_nombre(self, j):
+        return self._plegados[self._ids_nombre[j]]
+
+    def _clave_palabra(self, j):
+        return self._plegados[self._ids_palabra[j]][self._desde_palabra[j]:]
+
+    def _exactos(self, consulta):
+        posiciones = range(len(self._ids_nombre))
+        inicio = bisect_left(posiciones, consulta, key=self._clave_nombre)
+        fin = bisect_right(posiciones, consulta, key=self._clave_nombre)
+        return self._ids_nombre[inicio:fin]
+
+    def _por_prefijo(self, clave, ids, prefijo):
+        """Nombres con ese prefijo, primero los que la consulta cubre más."""
+        inicio, fin = _rango_prefijo(clave, len(ids), prefijo)
+        encontrados = ids[inicio:min(fin, inicio + MAX_CANDIDATOS_PREFIJO)]
+        largos = np.array([len(self._plegados[i]) for i in encontrados], dtype=np.int64)
+        return encontrados[np.argsort(largos, kind='stable')]
+
+    def _listas(self, consulta):
+        """(n.º de trigramas de la consulta, listas de nombres de los que están en el índice)."""
+        # letras fuera del alfabeto del índice quedan como 0: esos trigramas no están
+        codigos = _claves_trigramas([consulta], self._letra_de)
+        posiciones = np.searchsorted(self._codigos, codigos)
+        presentes = posiciones < len(self._codigos)
+        presentes[presentes] = self._codigos[posiciones[presentes]] == codigos[presentes]
+        listas = [self._duenos[self._cortes[p]:self._cortes[p + 1]] for p in posiciones[presentes]]
+        return len(trigramas(consulta)), listas
+
+    def _similares(self, consulta, k):
+        """(ids, similitud) de los k nombres más parecidos por trigramas.
+
+        Los candidatos salen de las listas más cortas (trigramas raros), como
+        mucho MAX_CANDIDATOS_SIMILARES: si ni la lista más corta cabe, el
+        resultado es aproximado. Las listas largas ('sas', ' sa', ...) solo
+        suman coincidencias a esos candidatos, con búsqueda binaria, y antes
+        de cada lista se descartan los que ya no pueden llegar a SIMILITUD_MINIMA.
+        """
+        n_consulta, listas = self._listas(consulta)
+        if not listas:
+            return np.array([], dtype=np.int64), np.array([])
+        listas.sort(key=len)
+        tomadas, total = 0, 0
+        while tomadas < len(listas) and (tomadas == 0 or total + len(listas[tomadas]) <= MAX_CANDIDATOS_SIMILARES):
+            total += len(listas[tomadas])
+            tomadas += 1
+        candidatos, comunes = np.unique(np.concatenate(listas[:tomadas]), return_counts=True)
+        if len(candidatos) > MAX_CANDIDATOS_SIMILARES:
+            # hasta el trigrama más raro es común: se cuentan solo los que más comparten
+            mejores = np.argsort(-comunes, kind='stable')[:MAX_CANDIDATOS_SIMILARES]
+            candidatos, comunes = candidatos[mejores], comunes[mejores]
+        # comunes / (n_consulta + n - comunes) >= s  <=>  comunes * (1 + s) >= s * (n_consulta + n)
+        necesarios = SIMILITUD_MINIMA * (n_consulta + self._n_trigramas[candidatos]) / (1 + SIMILITUD_MINIMA)
+        for restantes, lista in zip(range(len(listas) - tomadas, 0, -1), listas[tomadas:]):
+            posibles = comunes + restantes >= necesarios
+            candidatos, comunes, necesarios = candidatos[posibles], comunes[posibles], necesarios[posibles]
+            posiciones = np.minimum(np.searchsorted(lista, candidatos), len(lista) - 1)
+            comunes += lista[posiciones] == candidatos
+        similitud = comunes / (n_consulta + self._n_trigramas[candidatos] - comunes)
+        validos = similitud >= SIMILITUD_MINIMA
+        candidatos, similitud = candidatos[validos], similitud[validos]
+        orden = np.lexsort((candidatos, -similitud))[:k]      # empates: por posición
+        return candidatos[orden], similitud[orden]
+
+    def buscar(self, texto, k=10):
+        """Hasta k coincidencias ordenadas: [{'Cliente', 'coincidencia', 'similitud'}]."""
+        consulta = plegar(texto)
+        if not consulta or k <= 0:
+            return []
+        self.preparar()
+
+        vistos = {}
+
+        def agregar(ids, nivel, similitudes=None):
+            for j, i in enumerate(ids):
+                if len(vistos) >= k:
+                    return
+                i = int(i)
+                if i in vistos:
+                    continue
+                if similitudes is None:
+                    # exacta y prefijos: qué parte del nombre cubre la consulta
+                    similitud = len(consulta) / max(len(self._plegados[i]), 1)
+                else:
+                    similitud = float(similitudes[j])
+                vistos[i] = (nivel, similitud)
+
+        agregar(self._exactos(consulta), 'exacta')
+        agregar(self._por_prefijo(self._clave_nombre, self._ids_nombre, consulta), 'prefijo')
+        agregar(self._por_prefijo(self._clave_palabra, self._ids_palabra, consulta), 'palabra')
+        if len(vistos) < k:
+            ids, similitudes = self._similares(consulta, k + len(vistos))
+            agregar(ids, 'similar', similitudes)
+
+        return [{'Cliente': self.nombres[i], 'coincidencia': nivel, 'similitud': round(similitud, 3)}
+                for i, (nivel, similitud) in vistos.items()]
@@ -0,0 +1,147 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+# ============================================================
+# === CACHÉ COLUMNAR DE LOS ARCHIVOS EXCEL ===================
+# ============================================================
+# La primera lectura de cada Excel se guarda como Parquet en
+# CARPETA_CACHE. Los arranques siguientes leen el Parquet y solo se
+# vuelve a parsear el Excel cuando cambia su contenido.
+#
+# leer_tabla_compartida() además deja una copia Arrow IPC sin comprimir
+# y la abre con mmap: la API y Streamlit en el mismo equipo mapean el
+# mismo archivo, así las columnas numéricas ocupan una sola copia física
+# (la caché de páginas del sistema operativo) en lugar de una por proceso.
+
+CARPETA_CACHE = '.cache_datos'
+
+
+def hash_archivo(ruta, bloque=1 << 20):
+    """SHA-256 del archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _rutas_cache(ruta):
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    carpeta = os.path.join(os.path.dirname(os.path.abspath(ruta)), CARPETA_CACHE)
+    return (os.path.join(carpeta, f'{nombre}.parquet'),
+            os.path.join(carpeta, f'{nombre}.json'))
+
+
+def escribir_atomico(ruta, escribir):
+    """Escribe en un temporal y lo renombra, para no dejar archivos a medias.
+
+    `escribir(temporal)` crea el archivo temporal; el nombre incluye proceso e
+    hilo, así dos escritores simultáneos (workers, sesiones) no se pisan.
+    """
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        escribir(temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def _guardar_meta(ruta_meta, meta):
+    def escribir(temporal):
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    escribir_atomico(ruta_meta, escribir)
+
+
+def leer_tabla(ruta):
+    """Lee un Parquet directamente o un Excel a través de su caché columnar."""
+    if os.path.splitext(ruta)[1].lower() == '.parquet':
+        return pd.read_parquet(ruta)
+    return leer_excel_cacheado(ruta)
+
+
+def _ruta_compartida(ruta, estado):
+    """Copia Arrow de `ruta`; el nombre cambia con cada versión del origen."""
+    ruta_parquet, _ = _rutas_cache(ruta)
+    base = os.path.splitext(ruta_parquet)[0]
+    return f'{base}.{estado.st_mtime_ns}-{estado.st_size}.arrow', f'{base}.*.arrow'
+
+
+def leer_tabla_compartida(ruta, preparar=None):
+    """Lee `ruta` (Parquet o Excel) desde una copia Arrow mapeada en memoria.
+
+    Las columnas numéricas y de fecha sin nulos quedan como vistas de solo
+    lectura sobre el archivo mapeado; el texto sí se copia al convertir.
+    `preparar` (p. ej. compactar tipos) se aplica antes de escribir la copia.
+    """
+    import pyarrow as pa
+
+    ruta_arrow, patron = _ruta_compartida(ruta, os.stat(ruta))
+    if not os.path.exists(ruta_arrow):
+        df = leer_tabla(ruta)
+        if preparar is not None:
+            df = preparar(df)
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+
+        def escribir(temporal):
+            with pa.OSFile(temporal, 'wb') as destino, pa.ipc.new_file(destino, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+
+        escribir_atomico(ruta_arrow, escribir)
+        for vieja in glob.glob(patron):
+            if vieja != ruta_arrow:
+                try:
+                    os.remove(vieja)      # en Windows falla si otro proceso aún la tiene abierta
+                except OSError:
+                    pass
+
+    tabla = pa.ipc.open_file(pa.memory_map(ruta_arrow)).read_all()
+    return tabla.to_pandas(split_blocks=True)
+
+
+def leer_excel_cacheado(ruta):
+    """Lee un Excel a través de su copia Parquet, regenerándola si el origen cambió."""
+    ruta_parquet, ruta_meta = _rutas_cache(ruta)
+    estado = os.stat(ruta)
+
+    try:
+        with open(ruta_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = None
+
+    if meta is not None and os.path.exists(ruta_parquet):
+        vigente = meta.get('mtime_ns') == estado.st_mtime_ns and meta.get('tamano') == estado.st_size
+        if not vigente and meta.get('sha256') == hash_archivo(ruta):
+            # Solo cambió la fecha de modificación: el Parquet sigue sirviendo
+            meta.update(mtime_ns=estado.st_mtime_ns, tamano=estado.st_size)
+            _guardar_meta(ruta_meta, meta)
+            vigente = True
+        if vigente:
+            try:
+                return pd.read_parquet(ruta_parquet)
+            except Exception as e:
+                print(f"⚠️ Caché de '{ruta}' ilegible, se regenera: {e}")
+
+    df = pd.read_excel(ruta)
+
+    try:
+        escribir_atomico(ruta_parquet, lambda temporal: df.to_parquet(temporal, index=False))
+        _guardar_meta(ruta_meta, {
+            'origen': os.path.basename(ruta),
+            'mtime_ns': estado.st_mtime_ns,
+            'tamano': estado.st_size,
+            'sha256': hash_archivo(ruta)
+        })
+    except Exception as e:
+        # Sin pyarrow o con columnas de tipos mezclados: se sigue sin caché
+        print(f"⚠️ No se pudo guardar la caché columnar de '{ruta}': {e}")
+
+    return df
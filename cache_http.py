@@ -0,0 +1,93 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, request
+
+# ============================================================
+# === CACHÉ HTTP Y MEMORIZACIÓN DE RESPUESTAS ================
+# ============================================================
+# Las respuestas de los endpoints GET se guardan ya codificadas, con
+# clave (ruta, parámetros, versión de datos). Cada respuesta lleva
+# ETag, Last-Modified y Cache-Control, y las peticiones condicionales
+# (If-None-Match / If-Modified-Since) se contestan con 304 sin cuerpo.
+# Al cambiar la versión de datos la caché se vacía.
+
+
+def version_de_archivos(rutas):
+    """(versión, última modificación) a partir de mtime y tamaño de los archivos."""
+    firma = hashlib.sha1()
+    ultima = 0
+    for ruta in rutas:
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        firma.update(f'{ruta}:{estado.st_mtime_ns}:{estado.st_size};'.encode())
+        ultima = max(ultima, estado.st_mtime)
+    return firma.hexdigest()[:16], datetime.fromtimestamp(int(ultima), tz=timezone.utc)
+
+
+class CacheRespuestas:
+    """LRU acotada de respuestas codificadas, invalidada por versión de datos."""
+
+    def __init__(self, max_entradas=1024, max_age=60):
+        self.max_entradas = max_entradas
+        self.max_age = max_age
+        self.version = None
+        self.ultima_modificacion = None
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fijar_version(self, version, ultima_modificacion):
+        with self._lock:
+            if version != self.version:
+                self._entradas.clear()
+            self.version = version
+            self.ultima_modificacion = ultima_modificacion
+
+    def _obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+            return entrada
+
+    def _guardar(self, clave, entrada):
+        with self._lock:
+            if clave[-1] != self.version:
+                return  # la versión cambió mientras se calculaba
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def memorizar(self, vista):
+        """Decorador para endpoints GET cuya respuesta depende solo de los datos."""
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            clave = (request.path, tuple(sorted(request.args.items(multi=True))), self.version)
+            entrada = self._obtener(clave)
+
+            if entrada is None:
+                respuesta = vista(*args, **kwargs)
+                if respuesta.status_code != 200:
+                    return respuesta
+                cuerpo = respuesta.get_data()
+                etag = hashlib.blake2b(cuerpo, digest_size=12).hexdigest()
+                entrada = (cuerpo, respuesta.mimetype, etag)
+                self._guardar(clave, entrada)
+
+            cuerpo, tipo, etag = entrada
+            respuesta = Response(cuerpo, mimetype=tipo)
+            respuesta.set_etag(etag)
+            if self.ultima_modificacion is not None:
+                respuesta.last_modified = self.ultima_modificacion
+            respuesta.cache_control.public = True
+            respuesta.cache_control.max_age = self.max_age
+            return respuesta.make_conditional(request)
+
+        return envoltura
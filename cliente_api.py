@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ============================================================
+# === CLIENTE HTTP DE LA API PARA ui2.py =====================
+# ============================================================
+# Una sola requests.Session por proceso de Streamlit (conexiones
+# keep-alive reutilizadas), con timeouts y reintentos con backoff.
+# Las respuestas GET se guardan con st.cache_data durante TTL_CACHE
+# segundos y las listas iniciales se piden en paralelo.
+
+API_URL = os.environ.get('API_URL', 'http://127.0.0.1:5001')
+
+TIMEOUT = (3.05, 15)        # (conexión, lectura) en segundos
+TTL_CACHE = 60
+MAX_CONEXIONES = 10
+
+
+class ErrorParcial(Exception):
+    """Alguna de las peticiones en paralelo falló; trae lo que sí se obtuvo."""
+
+    def __init__(self, resultados, errores):
+        super().__init__(f"Fallaron {len(errores)} peticiones a la API")
+        self.resultados = resultados
+        self.errores = errores
+
+
+@st.cache_resource
+def _sesion():
+    reintentos = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET', 'POST'})
+    )
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONEXIONES, max_retries=reintentos)
+    sesion = requests.Session()
+    sesion.mount('http://', adaptador)
+    sesion.mount('https://', adaptador)
+    return sesion
+
+
+def _get(sesion, ruta, params=None):
+    respuesta = sesion.get(f"{API_URL}{ruta}", params=params, timeout=TIMEOUT)
+    respuesta.raise_for_status()
+    return respuesta.json()
+
+
+@st.cache_data(ttl=TTL_CACHE, show_spinner=False)
+def obtener(ruta, params=None):
+    """GET a la API con caché. Lanza requests.HTTPError si el estado no es 2xx."""
+    return _get(_sesion(), ruta, params)
+
+
+def enviar(ruta, datos):
+    """POST JSON a la API (sin caché)."""
+    respuesta = _sesion().post(f"{API_URL}{ruta}", json=datos, timeout=TIMEOUT)
+    respuesta.raise_for_status()
+    return respuesta.json()
+
+
+@st.cache_data(ttl=TTL_CACHE, show_spinner=False)
+def _obtener_varios(rutas):
+    resultados, errores = {}, {}
+    sesion = _sesion()     # se obtiene en el hilo del script, no en los del pool
+    with ThreadPoolExecutor(max_workers=min(len(rutas), MAX_CONEXIONES)) as ejecutor:
+        futuros = {ruta: ejecutor.submit(_get, sesion, ruta) for ruta in rutas}
+    for ruta, futuro in futuros.items():
+        try:
+            resultados[ruta] = futuro.result()
+        except Exception as e:
+            errores[ruta] = e
+    if errores:
+        raise ErrorParcial(resultados, errores)   # las excepciones no quedan en caché
+    return resultados
+
+
+def obtener_varios(rutas):
+    """GET en paralelo de varias rutas independientes.
+
+    Devuelve (resultados, errores), ambos diccionarios indexados por ruta.
+    """
+    try:
+        return _obtener_varios(tuple(rutas)), {}
+    except ErrorParcial as e:
+        return e.resultados, e.errores
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+from pronostico import NIVEL_POR_DEFECTO, pronosticar
+from repositorio import claves_normalizadas, normalizar_clave
+
+# ============================================================
+# === CONSULTAS SOBRE UNA INSTANTÁNEA ========================
+# ============================================================
+# Única implementación de las consultas de clientes, clusters y del
+# modelo lineal. Los endpoints de api2.py y las secciones de
+# streamlit_app.py llaman a estas funciones con la instantánea vigente
+# del repositorio (d = repo.actual); todas resuelven con los índices
+# precalculados, sin recorrer df_rfm.
+
+COLUMNAS_POR_MES = ['Cliente', 'recency', 'frequency']
+FILAS_PERFIL = 5
+
+# Columnas por las que se puede agrupar o filtrar en agregados()
+CLAVES_AGREGADO = ['Departamento', 'Cluster_RFM', 'mes_favorito', 'semana_favorita',
+                   'Ciudad', 'Pago', 'Tipo', 'Comercio']
+FUNCIONES_AGREGADO = ['count', 'sum', 'mean', 'median', 'min', 'max', 'std']
+
+
+def predecir(d, x):
+    """y = m * x + b del modelo lineal (x escalar o arreglo); None sin modelo."""
+    if d.m is None or d.b is None:
+        return None
+    return d.m * x + d.b
+
+
+def pronostico(d, horizonte, nivel=NIVEL_POR_DEFECTO):
+    """Predicciones mensuales con intervalo para los próximos `horizonte` meses; None sin modelo."""
+    if d.pronostico is None:
+        return None
+    return pronosticar(d.pronostico, horizonte, nivel)
+
+
+def grupo(d, indice, valor):
+    """Grupo precalculado ('departamento', 'cluster', ...) o None si no existe."""
+    return d.indices[indice].get(normalizar_clave(valor))
+
+
+def listar_clientes(d):
+    return d.indices['todos']['clientes']
+
+
+def obtener_cliente(d, nombre):
+    """Registro completo del cliente (sin distinguir mayúsculas) o None."""
+    pos = d.indices['cliente'].get(normalizar_clave(nombre))
+    if pos is None:
+        return None
+    return d.df_rfm.iloc[[pos]].to_dict(orient='records')[0]
+
+
+def buscar_clientes(d, texto, k=10):
+    """Clientes cuyo nombre empieza por / se parece a `texto`, de mejor a peor."""
+    return d.indices['busqueda'].buscar(texto, k)
+
+
+def listar_departamentos(d):
+    return d.indices['valores']['departamento']
+
+
+def clientes_por_departamento(d, departamento):
+    encontrado = grupo(d, 'departamento', departamento)
+    return encontrado['clientes'] if encontrado else []
+
+
+def listar_clusters(d):
+    return d.indices['valores']['cluster']
+
+
+def clientes_por_cluster(d, cluster):
+    """(clientes, vista previa de 5 registros) del cluster."""
+    encontrado = grupo(d, 'cluster', str(cluster).strip())
+    if encontrado is None:
+        return [], []
+    return encontrado['clientes'], encontrado['preview']
+
+
+def perfil_clusters(d):
+    """Primeras filas del perfil de clusters (DataFrame)."""
+    return d.df_perfil.head(FILAS_PERFIL)
+
+
+def listar_meses_favoritos(d):
+    return d.indices['valores']['mes']
+
+
+def columnas_por_mes(d):
+    return [c for c in COLUMNAS_POR_MES if c in d.df_rfm.columns]
+
+
+def filas_por_mes(d, mes):
+    """Posiciones en df_rfm de los clientes con ese mes favorito, o None."""
+    return grupo(d, 'mes', mes)
+
+
+def clientes_por_mes(d, mes):
+    filas = filas_por_mes(d, mes)
+    if filas is None:
+        return []
+    return d.df_rfm[columnas_por_mes(d)].iloc[filas].to_dict(orient='records')
+
+
+# ============================================================
+# === AGREGADOS ==============================================
+# ============================================================
+
+def _validar_columnas(d, columnas, permitidas, que):
+    invalidas = [c for c in columnas if c not in permitidas or c not in d.df_rfm.columns]
+    if invalidas:
+        raise ValueError(f"Columnas no permitidas en {que}: {', '.join(invalidas)}")
+
+
+def columnas_numericas(d):
+    return d.df_rfm.select_dtypes('number').columns.tolist()
+
+
+def _mascara_filtro(serie, valores):
+    """Filas cuyo valor normalizado está en `valores`.
+
+    Categóricas: se buscan los códigos en el diccionario y se comparan
+    enteros. Enteras: se comparan números. El resto, como texto.
+    """
+    buscados = {normalizar_clave(v) for v in valores}
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = pd.Index(claves_normalizadas(pd.Series(serie.cat.categories)))
+        return np.isin(serie.cat.codes.to_numpy(), np.flatnonzero(categorias.isin(buscados)))
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return serie.isin(pd.to_numeric(pd.Series(list(buscados)), errors='coerce').dropna()).to_numpy()
+    return np.isin(claves_normalizadas(serie), list(buscados))
+
+
+def filas_filtradas(d, filtros=None):
+    """Posiciones en df_rfm de las filas que cumplen los filtros (ver agregados)."""
+    filtros = filtros or {}
+    _validar_columnas(d, list(filtros), CLAVES_AGREGADO, "'filtro'")
+    if not filtros:
+        return np.arange(len(d.df_rfm))
+    mascara = np.ones(len(d.df_rfm), dtype=bool)
+    for columna, valores in filtros.items():
+        mascara &= _mascara_filtro(d.df_rfm[columna], valores)
+    return np.flatnonzero(mascara)
+
+
+def agregados(d, por=(), metricas=(), filtros=None):
+    """Agregados de df_rfm con un groupby vectorizado.
+
+    por: columnas de CLAVES_AGREGADO; metricas: pares (columna numérica,
+    función de FUNCIONES_AGREGADO); filtros: {columna: [valores]}, con
+    valores comparados como en los índices (sin mayúsculas ni espacios).
+    Siempre incluye 'clientes', el número de filas de cada grupo.
+    """
+    por, filtros = list(por), filtros or {}
+    _validar_columnas(d, por, CLAVES_AGREGADO, "'por'")
+    _validar_columnas(d, list(filtros), CLAVES_AGREGADO, "'filtro'")
+    _validar_columnas(d, [c for c, _ in metricas], columnas_numericas(d), "'metricas'")
+    funciones_invalidas = [f for _, f in metricas if f not in FUNCIONES_AGREGADO]
+    if funciones_invalidas:
+        raise ValueError(f"Función no válida: {', '.join(funciones_invalidas)} "
+                         f"(use {', '.join(FUNCIONES_AGREGADO)})")
+
+    df = d.df_rfm.iloc[filas_filtradas(d, filtros)] if filtros else d.df_rfm
+
+    especificacion = {'clientes': ('Cliente', 'size')}
+    especificacion.update({f'{columna}_{funcion}': (columna, funcion) for columna, funcion in metricas})
+
+    if not por:
+        fila = {nombre: df[columna].agg(funcion) for nombre, (columna, funcion) in especificacion.items()}
+        return pd.DataFrame([fila])
+    return df.groupby(por, sort=True, observed=True).agg(**especificacion).reset_index()
@@ -0,0 +1,91 @@
+import io
+
+from serializacion import a_json, registros
+
+# ============================================================
+# === EXPORTACIÓN POR BLOQUES DE df_rfm ======================
+# ============================================================
+# Generadores que codifican filas de df_rfm de a TAMANO_BLOQUE por vez,
+# para respuestas HTTP por streaming: la memoria depende del tamaño del
+# bloque y no del número de filas exportadas, y el primer bloque (la
+# cabecera CSV o el esquema Arrow) sale antes de recorrer la tabla.
+#
+#   csv      texto CSV con cabecera (UTF-8)
+#   ndjson   un objeto JSON por línea, con el criterio de tipos de
+#            serializacion.py (fechas ISO 8601, NaN -> null)
+#   arrow    formato IPC de streaming de Apache Arrow (requiere pyarrow)
+
+TAMANO_BLOQUE = 10_000
+
+# formato -> (mimetype, extensión del archivo descargado)
+FORMATOS_EXPORTACION = {
+    'csv': ('text/csv', 'csv'),       # Werkzeug añade '; charset=utf-8'
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def _bloques(df, filas, tamano_bloque):
+    """DataFrames consecutivos con las filas (posiciones) pedidas."""
+    for inicio in range(0, len(filas), tamano_bloque):
+        yield df.iloc[filas[inicio:inicio + tamano_bloque]]
+
+
+def _exportar_csv(df, filas, tamano_bloque):
+    yield df.head(0).to_csv(index=False).encode('utf-8')
+    for bloque in _bloques(df, filas, tamano_bloque):
+        yield bloque.to_csv(index=False, header=False).encode('utf-8')
+
+
+def _exportar_ndjson(df, filas, tamano_bloque):
+    for bloque in _bloques(df, filas, tamano_bloque):
+        yield b''.join(a_json(registro) + b'\n' for registro in registros(bloque))
+
+
+def _esquema_arrow(df):
+    """Esquema Arrow de df sin convertir la tabla entera.
+
+    Las columnas de texto (object) se infieren de sus primeros valores no
+    nulos; las de tipo numpy, fecha o categoría salen del dtype.
+    """
+    import pyarrow as pa
+
+    esquema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+    for i, campo in enumerate(esquema):
+        if pa.types.is_null(campo.type):
+            muestra = df[campo.name].dropna().head(1000)
+            if len(muestra):
+                esquema = esquema.set(i, campo.with_type(pa.array(muestra, from_pandas=True).type))
+    return esquema
+
+
+def _exportar_arrow(df, filas, tamano_bloque):
+    import pyarrow as pa
+
+    esquema = _esquema_arrow(df)
+    destino = io.BytesIO()
+
+    def vaciar():
+        datos = destino.getvalue()
+        destino.seek(0)
+        destino.truncate()
+        return datos
+
+    with pa.ipc.new_stream(destino, esquema) as escritor:
+        yield vaciar()
+        for bloque in _bloques(df, filas, tamano_bloque):
+            escritor.write_batch(pa.RecordBatch.from_pandas(bloque, schema=esquema, preserve_index=False))
+            yield vaciar()
+    yield vaciar()      # marca de fin del stream
+
+
+def exportar(df, filas, formato='csv', tamano_bloque=TAMANO_BLOQUE):
+    """Generador de bytes con las filas `filas` de df codificadas en `formato`."""
+    if formato == 'csv':
+        return _exportar_csv(df, filas, tamano_bloque)
+    if formato == 'ndjson':
+        return _exportar_ndjson(df, filas, tamano_bloque)
+    if formato == 'arrow':
+        return _exportar_arrow(df, filas, tamano_bloque)
+    raise ValueError(f"Formato de exportación desconocido '{formato}' "
+                     f"(use {', '.join(FORMATOS_EXPORTACION)})")
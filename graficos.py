@@ -0,0 +1,122 @@
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from pronostico import HORIZONTE_MAXIMO
+
+# ============================================================
+# === GRÁFICO DEL MODELO + PREDICCIÓN ========================
+# ============================================================
+# La serie histórica (capa base) es la misma para cualquier horizonte:
+# se dibuja una vez por versión de datos en una Figure que se conserva.
+# Cada petición solo agrega encima la capa de predicción (recta extendida
+# y punto futuro), guarda los bytes y la retira. Los bytes resultantes
+# quedan en una LRU acotada por entradas y por tamaño total.
+#
+# Se usa matplotlib.figure.Figure directamente (backend Agg, sin pyplot):
+# las figuras no quedan registradas en el estado global de pyplot, así
+# que no se acumulan entre ejecuciones de Streamlit ni entre peticiones.
+# matplotlib se importa al dibujar la primera capa base, no al importar
+# este módulo: la API y Streamlit arrancan sin pagar esa importación.
+
+FORMATOS_GRAFICO = {'png': 'image/png', 'svg': 'image/svg+xml'}
+MAX_ENTRADAS_GRAFICO = 64
+MAX_BYTES_GRAFICO = 32 * 1024 * 1024
+
+
+class GraficoPrediccion:
+    """Renderiza el gráfico serie + regresión extendida con caché por versión."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_GRAFICO, max_bytes=MAX_BYTES_GRAFICO, dpi=100):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self._base = None           # (version, figura, ejes, serie)
+        self._imagenes = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _capa_base(self, version, serie):
+        """Figure con la serie histórica; se reconstruye solo si cambia la versión."""
+        if self._base is not None and self._base[0] == version:
+            return self._base[1:]
+        if self._base is not None:
+            self._base[1].clear()   # libera los artistas de la figura anterior
+
+        from matplotlib.figure import Figure
+
+        figura = Figure(figsize=(14, 5), dpi=self.dpi)
+        ejes = figura.add_subplot()
+        ejes.plot(serie.index, serie.to_numpy(), marker="o", linewidth=2, label="Datos reales")
+        ejes.set_xlabel("Fecha")
+        ejes.set_ylabel("Valor Total")
+        ejes.set_title("Datos Originales + Modelo Extendido hasta la Predicción")
+        ejes.tick_params(axis='x', labelrotation=45)
+        figura.set_layout_engine('tight')
+
+        self._base = (version, figura, ejes, serie)
+        return self._base[1:]
+
+    def _dibujar(self, version, serie, m, b, meses, formato):
+        figura, ejes, serie = self._capa_base(version, serie)
+
+        tiempo = np.arange(len(serie))
+        x_futuro = tiempo[-1] + meses
+        fecha_futura = serie.index[-1] + pd.DateOffset(months=meses)
+        fechas_ext = list(serie.index) + [fecha_futura]
+        y_extendido = m * np.append(tiempo, x_futuro) + b
+
+        overlay = [
+            *ejes.plot(fechas_ext, y_extendido, linestyle="--", linewidth=2, color="orange",
+                       label="Regresión lineal extendida"),
+            ejes.scatter([fecha_futura], [m * x_futuro + b], color="red", s=150,
+                         label=f"Predicción ({fecha_futura.date()})"),
+        ]
+        leyenda = ejes.legend()
+        try:
+            salida = io.BytesIO()
+            figura.savefig(salida, format=formato)
+            return salida.getvalue()
+        finally:
+            # Se retira la capa de predicción: la base queda lista para el siguiente horizonte
+            for artista in overlay + [leyenda]:
+                artista.remove()
+            ejes.relim()
+            ejes.autoscale_view()
+
+    def renderizar(self, version, serie, m, b, meses, formato='png'):
+        """Bytes del gráfico de `serie` con la predicción a `meses` meses vista.
+
+        `version` identifica los datos y el modelo (la capa base y las
+        imágenes de otra versión se descartan).
+        """
+        if formato not in FORMATOS_GRAFICO:
+            raise ValueError(f"Formato desconocido '{formato}' (use {' o '.join(FORMATOS_GRAFICO)})")
+        meses = int(meses)
+        if not 1 <= meses <= HORIZONTE_MAXIMO:
+            raise ValueError(f"'meses' debe estar entre 1 y {HORIZONTE_MAXIMO}")
+        if serie.empty:
+            raise ValueError("La serie de ventas está vacía")
+
+        clave = (version, meses, formato)
+        with self._lock:
+            imagen = self._imagenes.get(clave)
+            if imagen is not None:
+                self._imagenes.move_to_end(clave)
+                return imagen
+
+            if self._base is not None and self._base[0] != version:
+                self._imagenes.clear()
+                self._bytes = 0
+
+            imagen = self._dibujar(version, serie, m, b, meses, formato)
+
+            self._imagenes[clave] = imagen
+            self._bytes += len(imagen)
+            while self._imagenes and (len(self._imagenes) > self.max_entradas or self._bytes > self.max_bytes):
+                _, vieja = self._imagenes.popitem(last=False)
+                self._bytes -= len(vieja)
+            return imagen
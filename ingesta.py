@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+
+# ============================================================
+# === INGESTA POR LOTES DE ARCHIVOS DE TRANSACCIONES =========
+# ============================================================
+# Lee XLSX (openpyxl en modo solo lectura), CSV y Parquet como una
+# secuencia de DataFrames de a lo sumo TAMANO_LOTE filas, conservando
+# solo las columnas pedidas. Quien consume los lotes (agregados
+# mensuales, RFM) acumula resultados parciales, así la memoria depende
+# del tamaño del lote y no del tamaño del archivo.
+
+TAMANO_LOTE = 50_000
+
+# Tipos esperados de las columnas de transacciones que usan los procesos
+TIPOS_TRANSACCIONES = {
+    'Cliente': 'string',
+    'Fecha': 'fecha',
+    'Vlr Total': 'float64',
+    'Cantidad': 'float64',
+    'Devolucion': 'float64',
+    'Bonificacion': 'float64',
+}
+
+
+def _lotes_xlsx(ruta, columnas, tamano_lote, hoja=None):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        hoja_excel = libro[hoja] if hoja else libro.active
+        filas = hoja_excel.iter_rows(values_only=True)
+        encabezado = [str(c) if c is not None else '' for c in next(filas, ())]
+
+        nombres = columnas or [c for c in encabezado if c]
+        faltantes = [c for c in nombres if c not in encabezado]
+        if faltantes:
+            raise ValueError(f"Columnas no encontradas en '{ruta}': {', '.join(faltantes)}")
+        posiciones = [encabezado.index(c) for c in nombres]
+
+        lote = []
+        for fila in filas:
+            lote.append([fila[i] if i < len(fila) else None for i in posiciones])
+            if len(lote) >= tamano_lote:
+                yield pd.DataFrame(lote, columns=nombres)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=nombres)
+    finally:
+        libro.close()
+
+
+def _lotes_csv(ruta, columnas, tamano_lote):
+    yield from pd.read_csv(ruta, usecols=columnas, chunksize=tamano_lote)
+
+
+def _lotes_parquet(ruta, columnas, tamano_lote):
+    import pyarrow.parquet as pq
+
+    archivo = pq.ParquetFile(ruta)
+    for lote in archivo.iter_batches(batch_size=tamano_lote, columns=columnas):
+        yield lote.to_pandas()
+
+
+def leer_lotes(ruta, columnas=None, tamano_lote=TAMANO_LOTE):
+    """Genera DataFrames de hasta tamano_lote filas con las columnas pedidas."""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return _lotes_xlsx(ruta, columnas, tamano_lote)
+    if extension == '.csv':
+        return _lotes_csv(ruta, columnas, tamano_lote)
+    if extension == '.parquet':
+        return _lotes_parquet(ruta, columnas, tamano_lote)
+    raise ValueError(f"Formato de archivo no soportado: '{ruta}'")
+
+
+def coercionar(lote, tipos=TIPOS_TRANSACCIONES, formato_fecha=None):
+    """Convierte las columnas del lote a los tipos indicados.
+
+    'fecha' se interpreta con pd.to_datetime (valores inválidos -> NaT); los
+    numéricos con pd.to_numeric (inválidos -> NaN).
+    """
+    lote = lote.copy()
+    for columna, tipo in tipos.items():
+        if columna not in lote.columns:
+            continue
+        if tipo == 'fecha':
+            lote[columna] = pd.to_datetime(lote[columna], format=formato_fecha, errors='coerce')
+        elif tipo == 'string':
+            lote[columna] = lote[columna].astype('string')
+        else:
+            lote[columna] = pd.to_numeric(lote[columna], errors='coerce').astype(tipo)
+    return lote
+
+
+def ingerir(ruta, columnas, tipos=TIPOS_TRANSACCIONES, tamano_lote=TAMANO_LOTE, formato_fecha=None):
+    """Lotes ya tipados, sin las filas cuya Fecha no se pudo interpretar."""
+    for lote in leer_lotes(ruta, columnas, tamano_lote):
+        lote = coercionar(lote, tipos, formato_fecha)
+        if 'Fecha' in lote.columns:
+            lote = lote[lote['Fecha'].notna()]
+        if not lote.empty:
+            yield lote
@@ -0,0 +1,141 @@
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from flask import Response, g, request
+
+# ============================================================
+# === MÉTRICAS DE PETICIONES (FORMATO PROMETHEUS) ============
+# ============================================================
+# Por cada ruta se cuentan peticiones por estado, un histograma de
+# latencia, otro de tamaño de respuesta y los errores (estado >= 500).
+# Además se publican los tiempos de las fases de carga de datos.
+# Todo se expone en texto Prometheus en /metrics.
+#
+# Las métricas son por proceso: con varios workers de gunicorn cada
+# uno lleva sus propios contadores.
+#
+# API_LOG_PETICIONES=archivo.jsonl escribe además una línea JSON por
+# petición.
+
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LIMITES_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class _Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)     # la última es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, n in zip(list(self.limites) + ['+Inf'], self.cubetas):
+            acumulado += n
+            yield f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+        yield f'{nombre}_sum{{{etiquetas}}} {self.suma}'
+        yield f'{nombre}_count{{{etiquetas}}} {self.cuenta}'
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metricas:
+    """Contadores e histogramas de peticiones, seguros entre hilos."""
+
+    def __init__(self, ruta_log=None):
+        self.ruta_log = ruta_log
+        self.tiempos_carga = {}
+        self._peticiones = defaultdict(int)                       # (ruta, método, estado) -> n
+        self._errores = defaultdict(int)                          # (ruta, método) -> n
+        self._latencias = defaultdict(lambda: _Histograma(LIMITES_LATENCIA))
+        self._tamanos = defaultdict(lambda: _Histograma(LIMITES_BYTES))
+        self._lock = threading.Lock()
+        self._lock_log = threading.Lock()
+
+    def registrar(self, ruta, metodo, estado, segundos, n_bytes):
+        with self._lock:
+            self._peticiones[(ruta, metodo, estado)] += 1
+            if estado >= 500:
+                self._errores[(ruta, metodo)] += 1
+            self._latencias[(ruta, metodo)].observar(segundos)
+            self._tamanos[(ruta, metodo)].observar(n_bytes)
+
+    def escribir_log(self, registro):
+        if not self.ruta_log:
+            return
+        linea = json.dumps(registro, ensure_ascii=False) + '\n'
+        with self._lock_log, open(self.ruta_log, 'a', encoding='utf-8') as f:
+            f.write(linea)
+
+    def texto_prometheus(self):
+        with self._lock:
+            lineas = [
+                '# HELP api_peticiones_total Peticiones atendidas por ruta, método y estado.',
+                '# TYPE api_peticiones_total counter',
+            ]
+            for (ruta, metodo, estado), n in sorted(self._peticiones.items()):
+                lineas.append(f'api_peticiones_total{{ruta="{_etiqueta(ruta)}",metodo="{metodo}",estado="{estado}"}} {n}')
+
+            lineas += ['# HELP api_errores_total Peticiones con estado >= 500.',
+                       '# TYPE api_errores_total counter']
+            for (ruta, metodo), n in sorted(self._errores.items()):
+                lineas.append(f'api_errores_total{{ruta="{_etiqueta(ruta)}",metodo="{metodo}"}} {n}')
+
+            lineas += ['# HELP api_latencia_segundos Tiempo de respuesta.',
+                       '# TYPE api_latencia_segundos histogram']
+            for (ruta, metodo), h in sorted(self._latencias.items()):
+                lineas.extend(h.lineas('api_latencia_segundos', f'ruta="{_etiqueta(ruta)}",metodo="{metodo}"'))
+
+            lineas += ['# HELP api_respuesta_bytes Tamaño del cuerpo de la respuesta.',
+                       '# TYPE api_respuesta_bytes histogram']
+            for (ruta, metodo), h in sorted(self._tamanos.items()):
+                lineas.extend(h.lineas('api_respuesta_bytes', f'ruta="{_etiqueta(ruta)}",metodo="{metodo}"'))
+
+        lineas += ['# HELP api_carga_segundos Duración de cada fase de la última carga de datos.',
+                   '# TYPE api_carga_segundos gauge']
+        for fase, segundos in self.tiempos_carga.items():
+            lineas.append(f'api_carga_segundos{{fase="{_etiqueta(fase)}"}} {segundos}')
+
+        return '\n'.join(lineas) + '\n'
+
+    def instalar(self, app, ruta='/metrics'):
+        """Engancha la medición a la app de Flask y publica el endpoint."""
+
+        @app.before_request
+        def _iniciar_cronometro():
+            g.inicio_peticion = time.perf_counter()
+
+        @app.after_request
+        def _medir(respuesta):
+            inicio = g.pop('inicio_peticion', None)
+            if inicio is None:
+                return respuesta
+            segundos = time.perf_counter() - inicio
+            ruta_regla = request.url_rule.rule if request.url_rule else 'sin_ruta'
+            n_bytes = respuesta.content_length or 0     # 0 en respuestas por streaming
+            self.registrar(ruta_regla, request.method, respuesta.status_code, segundos, n_bytes)
+            self.escribir_log({
+                'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                'metodo': request.method,
+                'ruta': ruta_regla,
+                'path': request.path,
+                'estado': respuesta.status_code,
+                'duracion_ms': round(segundos * 1000, 3),
+                'bytes': n_bytes
+            })
+            return respuesta
+
+        @app.route(ruta, methods=['GET'])
+        def metricas_prometheus():
+            return Response(self.texto_prometheus(), mimetype='text/plain; version=0.0.4')
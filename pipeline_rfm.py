@@ -0,0 +1,247 @@
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from agregados_mensuales import FUENTES_TRANSACCIONES, expandir_fuentes
+from cache_columnar import escribir_atomico, leer_tabla
+from ingesta import TIPOS_TRANSACCIONES, ingerir
+from segmentacion import asignar_clusters, matriz_variables, perfil_clusters
+
+# ============================================================
+# === PIPELINE RFM: TRANSACCIONES -> SEGMENTOS ===============
+# ============================================================
+# Recalcula la tabla de resultado_rfm (recency, frequency, monetary,
+# mes y semana favoritos, ...) a partir de las transacciones crudas y
+# le asigna Cluster_RFM con modelo_cluster_rfm.joblib.
+#
+#   python pipeline_rfm.py
+#   python pipeline_rfm.py --transacciones ventas_2025.csv --excel
+#
+# Las transacciones se leen por lotes (ingesta.py); los agregados
+# parciales por cliente de cada lote se combinan enseguida con los
+# acumulados (otro groupby), de modo que solo hay una tabla por cliente
+# de cada tipo a la vez y la memoria depende del número de clientes y
+# no del de transacciones. El resultado se escribe en Parquet
+# (resultado_rfm.parquet, perfil_clusters_rfm.parquet), que la API
+# prefiere sobre los Excel y recarga en caliente al detectar el cambio.
+
+RUTA_SALIDA_RFM = 'resultado_rfm.parquet'
+RUTA_SALIDA_PERFIL = 'perfil_clusters_rfm.parquet'
+RUTA_MODELO_CLUSTER = 'modelo_cluster_rfm.joblib'
+
+COLUMNAS_TRANSACCIONES = ['Cliente', 'Fecha', 'Vlr Total', 'Venta', 'Devolucion', 'Bonificacion',
+                          '% de Bonif', 'Vlr Unitario', 'Departamento', 'Ciudad', 'Pago']
+
+TIPOS_PIPELINE = {
+    **TIPOS_TRANSACCIONES,
+    'Venta': 'float64',
+    '% de Bonif': 'float64',
+    'Vlr Unitario': 'float64',
+    'Departamento': 'string',
+    'Ciudad': 'string',
+    'Pago': 'string',
+}
+
+# Atributos del maestro de clientes que no salen de las transacciones
+COLUMNAS_MAESTRO = ['antiguedad', 'Tipo', 'Comercio', 'Mercado']
+
+COLUMNAS_RESULTADO = ['Cliente', 'ultima_compra', 'frequency', 'monetary', 'mes_favorito',
+                      'semana_favorita', 'total_cantidades', 'total_devoluciones',
+                      'total_bonificaciones', 'pct_bonif_promedio', 'vlr_unitario_promedio',
+                      'antiguedad', 'recency', 'meses_sin_comprar', 'Departamento', 'Ciudad',
+                      'Pago', 'Tipo', 'Comercio', 'Mercado', 'Cluster_RFM']
+
+DIAS_POR_MES = 30.44
+
+
+# ============================================================
+# === AGREGACIÓN POR LOTES ===================================
+# ============================================================
+
+def semana_del_mes(fechas):
+    """Semana 1-4 del mes: el mes se divide en cuatro tramos iguales."""
+    return np.ceil(fechas.dt.day * 4 / fechas.dt.days_in_month).astype('int64')
+
+
+def _parciales(lote):
+    """Agregados de un lote que se pueden combinar con los de otros lotes."""
+    base = lote.groupby('Cliente', sort=False).agg(
+        ultima_compra=('Fecha', 'max'),
+        frequency=('Fecha', 'size'),
+        monetary=('Vlr Total', 'sum'),
+        total_cantidades=('Venta', 'sum'),
+        total_devoluciones=('Devolucion', 'sum'),
+        total_bonificaciones=('Bonificacion', 'sum'),
+        suma_pct_bonif=('% de Bonif', 'sum'),
+        n_pct_bonif=('% de Bonif', 'count'),
+        suma_vlr_unitario=('Vlr Unitario', 'sum'),
+        n_vlr_unitario=('Vlr Unitario', 'count'),
+    )
+    conteos = pd.DataFrame({
+        'Cliente': lote['Cliente'],
+        'mes': lote['Fecha'].dt.month,
+        'semana': semana_del_mes(lote['Fecha']),
+    })
+    meses = conteos.groupby(['Cliente', 'mes'], sort=False).size().reset_index(name='n')
+    semanas = conteos.groupby(['Cliente', 'semana'], sort=False).size().reset_index(name='n')
+    atributos = (lote[['Cliente', 'Fecha', 'Departamento', 'Ciudad', 'Pago']]
+                 .sort_values('Fecha', kind='stable')
+                 .drop_duplicates('Cliente', keep='last'))
+    return base, meses, semanas, atributos
+
+
+AGREGACION_BASE = {
+    'ultima_compra': 'max', 'frequency': 'sum', 'monetary': 'sum',
+    'total_cantidades': 'sum', 'total_devoluciones': 'sum', 'total_bonificaciones': 'sum',
+    'suma_pct_bonif': 'sum', 'n_pct_bonif': 'sum',
+    'suma_vlr_unitario': 'sum', 'n_vlr_unitario': 'sum',
+}
+
+
+def _combinar(parciales):
+    """Une varios (base, meses, semanas, atributos) en uno, con una fila por cliente y clave."""
+    base, meses, semanas, atributos = (pd.concat(tablas) for tablas in zip(*parciales))
+    base = base.groupby(level=0, sort=False).agg(AGREGACION_BASE)
+    meses = meses.groupby(['Cliente', 'mes'], sort=False)['n'].sum().reset_index()
+    semanas = semanas.groupby(['Cliente', 'semana'], sort=False)['n'].sum().reset_index()
+    # En empate de fecha gana el lote más reciente, como con un solo recorrido
+    atributos = atributos.sort_values('Fecha', kind='stable').drop_duplicates('Cliente', keep='last')
+    return base, meses, semanas, atributos
+
+
+def _favorito(conteos, nombre):
+    """Valor más frecuente por cliente (en empate, el menor)."""
+    tabla = conteos.groupby(['Cliente', nombre], sort=False)['n'].sum().reset_index()
+    tabla = tabla.sort_values(['Cliente', 'n', nombre], ascending=[True, False, True])
+    return tabla.drop_duplicates('Cliente').set_index('Cliente')[nombre]
+
+
+def calcular_rfm(rutas, fecha_referencia=None, tamano_lote=None):
+    """Tabla RFM por cliente a partir de uno o varios archivos de transacciones."""
+    # Los parciales pendientes se combinan con los acumulados cuando suman
+    # tantos clientes como ellos: la memoria sigue acotada por el número
+    # de clientes y no se rehace el groupby de todo lo acumulado en cada lote.
+    acumulados, pendientes, filas_pendientes = [], [], 0
+    for ruta in rutas:
+        opciones = {'tamano_lote': tamano_lote} if tamano_lote else {}
+        for lote in ingerir(ruta, COLUMNAS_TRANSACCIONES, TIPOS_PIPELINE, **opciones):
+            lote = lote[lote['Cliente'].notna()]
+            pendientes.append(_parciales(lote))
+            filas_pendientes += len(pendientes[-1][0])
+            if filas_pendientes >= sum(len(a[0]) for a in acumulados):
+                acumulados, pendientes, filas_pendientes = [_combinar(acumulados + pendientes)], [], 0
+
+    if not acumulados and not pendientes:
+        raise ValueError("No se encontraron transacciones válidas.")
+
+    base, meses, semanas, atributos = _combinar(acumulados + pendientes)
+    base = base.sort_index()
+    base.index.name = 'Cliente'
+
+    referencia = pd.Timestamp(fecha_referencia) if fecha_referencia else base['ultima_compra'].max()
+
+    rfm = pd.DataFrame(index=base.index)
+    rfm['ultima_compra'] = base['ultima_compra']
+    rfm['frequency'] = base['frequency'].astype('int64')
+    rfm['monetary'] = base['monetary']
+    rfm['mes_favorito'] = _favorito(meses, 'mes').astype('int64')
+    rfm['semana_favorita'] = _favorito(semanas, 'semana')
+    rfm['total_cantidades'] = base['total_cantidades'].astype('int64')
+    rfm['total_devoluciones'] = base['total_devoluciones'].astype('int64')
+    rfm['total_bonificaciones'] = base['total_bonificaciones'].astype('int64')
+    rfm['pct_bonif_promedio'] = (base['suma_pct_bonif'] / base['n_pct_bonif']).round(2)
+    rfm['vlr_unitario_promedio'] = (base['suma_vlr_unitario'] / base['n_vlr_unitario']).round(2)
+    rfm['recency'] = (referencia - rfm['ultima_compra']).dt.days
+    rfm['meses_sin_comprar'] = rfm['recency'] / DIAS_POR_MES
+
+    rfm = rfm.join(atributos.set_index('Cliente')[['Departamento', 'Ciudad', 'Pago']])
+
+    return rfm.reset_index()
+
+
+# ============================================================
+# === ESCRITURA ==============================================
+# ============================================================
+
+def _escribir_parquet(df, ruta):
+    # la API nunca ve un archivo a medio escribir
+    escribir_atomico(ruta, lambda temporal: df.to_parquet(temporal, index=False))
+
+
+def ejecutar(rutas, ruta_maestro, ruta_modelo, salida_rfm, salida_perfil,
+             fecha_referencia=None, excel=False, tamano_lote=None):
+    tiempos = {}
+    inicio = time.perf_counter()
+    rfm = calcular_rfm(rutas, fecha_referencia, tamano_lote)
+    tiempos['agregacion'] = time.perf_counter() - inicio
+
+    if ruta_maestro and os.path.exists(ruta_maestro):
+        maestro = leer_tabla(ruta_maestro)
+        columnas = [c for c in COLUMNAS_MAESTRO if c in maestro.columns]
+        maestro = maestro.drop_duplicates('Cliente').set_index('Cliente')[columnas]
+        rfm = rfm.join(maestro, on='Cliente')
+    for columna in COLUMNAS_MAESTRO:
+        if columna not in rfm.columns:
+            rfm[columna] = pd.NA
+
+    inicio = time.perf_counter()
+    modelo_cluster = joblib.load(ruta_modelo)
+    X = matriz_variables(rfm, modelo_cluster['variables'], rellenar=0.0)
+    rfm['Cluster_RFM'] = asignar_clusters(X, modelo_cluster)
+    tiempos['clusters'] = time.perf_counter() - inicio
+
+    rfm = rfm[COLUMNAS_RESULTADO]
+    perfil = perfil_clusters(rfm, modelo_cluster['variables'])
+
+    inicio = time.perf_counter()
+    _escribir_parquet(rfm, salida_rfm)
+    _escribir_parquet(perfil, salida_perfil)
+    if excel:
+        rfm.to_excel(os.path.splitext(salida_rfm)[0] + '.xlsx', index=False)
+        perfil.to_excel(os.path.splitext(salida_perfil)[0] + '.xlsx', index=False)
+    tiempos['escritura'] = time.perf_counter() - inicio
+
+    return rfm, perfil, tiempos
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description="Recalcula la segmentación RFM desde las transacciones.")
+    parser.add_argument('--transacciones', nargs='+', default=FUENTES_TRANSACCIONES,
+                        help="archivos o patrones glob (xlsx, csv, parquet)")
+    parser.add_argument('--maestro', default=None,
+                        help="tabla con antiguedad/Tipo/Comercio/Mercado por cliente "
+                             "(por defecto, el resultado_rfm vigente)")
+    parser.add_argument('--modelo', default=RUTA_MODELO_CLUSTER)
+    parser.add_argument('--salida', default=RUTA_SALIDA_RFM)
+    parser.add_argument('--salida-perfil', default=RUTA_SALIDA_PERFIL)
+    parser.add_argument('--fecha-referencia', default=None,
+                        help="fecha para calcular recency (por defecto, la última transacción)")
+    parser.add_argument('--tamano-lote', type=int, default=None)
+    parser.add_argument('--excel', action='store_true', help="escribir también copias .xlsx")
+    return parser.parse_args()
+
+
+def main():
+    args = _argumentos()
+    rutas = expandir_fuentes(args.transacciones)
+    if not rutas:
+        raise SystemExit("❌ No se encontraron archivos de transacciones.")
+
+    maestro = args.maestro
+    if maestro is None:
+        maestro = RUTA_SALIDA_RFM if os.path.exists(RUTA_SALIDA_RFM) else 'resultado_rfm.xlsx'
+
+    rfm, perfil, tiempos = ejecutar(rutas, maestro, args.modelo, args.salida, args.salida_perfil,
+                                    args.fecha_referencia, args.excel, args.tamano_lote)
+
+    print(f"✅ {len(rfm)} clientes segmentados en {len(perfil)} clusters -> '{args.salida}'")
+    for fase, segundos in tiempos.items():
+        print(f"   {fase}: {segundos:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# === PREPROCESAMIENTO DE LA SERIE MENSUAL DE VENTAS =========
+# ============================================================
+
+
+def serie_mensual(df):
+    """Suma mensual de 'Vlr Total' a partir de las transacciones (columna Fecha)."""
+    serie = df['Vlr Total'].set_axis(pd.to_datetime(df['Fecha'])).resample('ME').sum()
+    serie.index.name = 'Fecha'
+    return serie.to_frame('Vlr Total')
+
+
+def reemplazar_outliers_iqr(serie, vecinos=3, factor=1.5):
+    """Reemplaza los outliers (regla IQR) por el promedio de sus vecinos.
+
+    Para cada outlier se promedian los valores originales de las `vecinos`
+    posiciones a cada lado, sin incluir el propio punto. Todo se calcula con
+    ventanas móviles centradas, sin recorrer la serie en Python.
+    """
+    q1, q3 = serie.quantile(0.25), serie.quantile(0.75)
+    iqr = q3 - q1
+    es_outlier = (serie < q1 - factor * iqr) | (serie > q3 + factor * iqr)
+    if not es_outlier.any():
+        return serie.copy()
+
+    ventana = serie.rolling(2 * vecinos + 1, center=True, min_periods=1)
+    suma_vecinos = ventana.sum() - serie
+    n_vecinos = ventana.count() - 1
+    promedio_vecinos = suma_vecinos / n_vecinos.replace(0, np.nan)
+
+    return serie.mask(es_outlier, promedio_vecinos)
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# === PRONÓSTICO MENSUAL CON INTERVALOS DE PREDICCIÓN ========
+# ============================================================
+# El modelo lineal de MachineLearning.joblib es y = m * Tiempo + b sobre
+# la serie mensual guardada en 'data'. Al cargar la instantánea se
+# calculan una vez los residuos y las sumas que necesita el intervalo de
+# predicción de la regresión simple:
+#
+#   y ± t(n-2) * s * sqrt(1 + 1/n + (x - media_x)² / Sxx)
+#
+# Un pronóstico es entonces una sola operación vectorizada sobre los
+# meses del horizonte, con sus fechas de fin de mes ya calculadas.
+
+HORIZONTE_MAXIMO = 120          # meses
+NIVEL_POR_DEFECTO = 0.95
+
+
+@dataclass(frozen=True)
+class ParametrosPronostico:
+    m: float
+    b: float
+    n: int
+    media_x: float
+    sxx: float
+    error_estandar: float       # desviación de los residuos (n - 2 grados de libertad)
+    ultimo_tiempo: int
+    ultima_fecha: pd.Timestamp
+
+
+def preparar_pronostico(df_model, m, b):
+    """Parámetros del pronóstico a partir de 'data' del joblib (None si no alcanza)."""
+    if df_model is None or m is None or b is None or len(df_model) < 3:
+        return None
+    x = df_model['Tiempo'].to_numpy(dtype=float)
+    y = df_model['Vlr Total'].to_numpy(dtype=float)
+    residuos = y - (m * x + b)
+    return ParametrosPronostico(
+        m=float(m),
+        b=float(b),
+        n=len(x),
+        media_x=float(x.mean()),
+        sxx=float(((x - x.mean()) ** 2).sum()),
+        error_estandar=float(np.sqrt((residuos ** 2).sum() / (len(x) - 2))),
+        ultimo_tiempo=int(x.max()),
+        ultima_fecha=pd.Timestamp(df_model.index.max())
+    )
+
+
+def pronosticar(parametros, horizonte, nivel=NIVEL_POR_DEFECTO):
+    """DataFrame con Fecha, Tiempo, y_pred, inferior y superior de los próximos meses."""
+    horizonte = int(horizonte)
+    if not 1 <= horizonte <= HORIZONTE_MAXIMO:
+        raise ValueError(f"'horizonte' debe estar entre 1 y {HORIZONTE_MAXIMO}")
+    if not 0 < nivel < 1:
+        raise ValueError("'nivel' debe estar entre 0 y 1")
+
+    from scipy import stats     # diferido: importar scipy.stats es lento (ver arranque.py)
+
+    p = parametros
+    pasos = np.arange(1, horizonte + 1)
+    x = p.ultimo_tiempo + pasos
+    y = p.m * x + p.b
+    t = stats.t.ppf(0.5 + nivel / 2, p.n - 2)
+    margen = t * p.error_estandar * np.sqrt(1 + 1 / p.n + (x - p.media_x) ** 2 / p.sxx)
+
+    return pd.DataFrame({
+        'Fecha': pd.date_range(p.ultima_fecha + pd.offsets.MonthEnd(1), periods=horizonte, freq='ME'),
+        'Tiempo': x,
+        'y_pred': y,
+        'inferior': y - margen,
+        'superior': y + margen,
+    })
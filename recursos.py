@@ -0,0 +1,143 @@
+import hashlib
+import io
+import os
+import threading
+from dataclasses import dataclass
+
+from cache_columnar import CARPETA_CACHE, escribir_atomico, hash_archivo
+
+# ============================================================
+# === RECURSOS ESTÁTICOS: VARIANTES DE IMÁGENES ==============
+# ============================================================
+# Cada imagen (p. ej. descargar.png, el mapa de clusters) se identifica
+# por el sha256 de su contenido. Las variantes (ancho x formato) se
+# generan una sola vez por huella, se guardan en .cache_datos/recursos
+# (sobreviven a reinicios) y quedan en memoria ya codificadas, junto con
+# la imagen decodificada de la que salen. Al cambiar el archivo cambia
+# la huella y las variantes viejas dejan de usarse.
+#
+#   webp  con pérdida (calidad CALIDAD_WEBP): la más liviana
+#   png   sin pérdida, recomprimido con optimize
+#
+# El nombre versionado ('descargar.<huella>.<ancho>.<formato>') sirve de
+# URL inmutable: /recursos/<nombre> en api2.py.
+
+CARPETA_RECURSOS = os.path.join(CARPETA_CACHE, 'recursos')
+
+ANCHOS_RECURSO = (320, 480)        # además del ancho original
+FORMATOS_RECURSO = {'webp': 'image/webp', 'png': 'image/png'}
+CALIDAD_WEBP = 85
+
+
+@dataclass(frozen=True)
+class Variante:
+    nombre: str         # nombre versionado: base.huella.ancho.formato
+    datos: bytes
+    mimetype: str
+    etag: str
+
+
+class Recurso:
+    """Imagen de origen con sus variantes redimensionadas y recodificadas."""
+
+    def __init__(self, ruta, carpeta=CARPETA_RECURSOS):
+        self.ruta = ruta
+        self.carpeta = carpeta
+        self.base = os.path.splitext(os.path.basename(ruta))[0]
+        self._estado = None            # (mtime_ns, tamaño) con el que se calculó la huella
+        self.huella = None
+        self._imagen = None            # imagen decodificada (PIL) de la huella vigente
+        self._variantes = {}           # (ancho, formato) -> Variante de la huella vigente
+        self._lock = threading.Lock()
+
+    def _actualizar(self):
+        """Recalcula la huella si el archivo cambió (mtime o tamaño)."""
+        estado = os.stat(self.ruta)
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if firma == self._estado:
+            return
+        huella = hash_archivo(self.ruta)[:16]
+        if huella != self.huella:
+            self.huella, self._imagen, self._variantes = huella, None, {}
+        self._estado = firma
+
+    def _decodificada(self):
+        if self._imagen is None:
+            from PIL import Image
+
+            with Image.open(self.ruta) as imagen:
+                imagen.load()
+            # Con alfa totalmente opaco el canal no aporta nada: se descarta
+            if imagen.mode in ('RGBA', 'LA') and imagen.getchannel('A').getextrema() == (255, 255):
+                imagen = imagen.convert('RGB')
+            self._imagen = imagen
+        return self._imagen
+
+    def anchos(self):
+        """Anchos disponibles, de menor a mayor (el último es el original)."""
+        original = self._decodificada().width
+        return [a for a in ANCHOS_RECURSO if a < original] + [original]
+
+    def _ancho_variante(self, ancho):
+        """El menor ancho disponible que cubre el pedido (el original si ninguno)."""
+        disponibles = self.anchos()
+        if ancho is None:
+            return disponibles[-1]
+        return next((a for a in disponibles if a >= ancho), disponibles[-1])
+
+    def _codificar(self, ancho, formato):
+        from PIL import Image
+
+        imagen = self._decodificada()
+        if ancho != imagen.width:
+            imagen = imagen.resize((ancho, round(imagen.height * ancho / imagen.width)), Image.LANCZOS)
+        salida = io.BytesIO()
+        if formato == 'webp':
+            imagen.save(salida, 'WEBP', quality=CALIDAD_WEBP, method=6)
+        else:
+            imagen.save(salida, 'PNG', optimize=True)
+        return salida.getvalue()
+
+    def _generar(self, ancho, formato):
+        nombre = f'{self.base}.{self.huella}.{ancho}.{formato}'
+        ruta = os.path.join(self.carpeta, nombre)
+        try:
+            with open(ruta, 'rb') as f:
+                datos = f.read()
+        except OSError:
+            datos = self._codificar(ancho, formato)
+
+            def escribir(temporal):
+                with open(temporal, 'wb') as f:
+                    f.write(datos)
+
+            try:
+                escribir_atomico(ruta, escribir)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar la variante '{nombre}': {e}")
+        etag = hashlib.blake2b(datos, digest_size=12).hexdigest()
+        return Variante(nombre, datos, FORMATOS_RECURSO[formato], etag)
+
+    def variante(self, ancho=None, formato='webp'):
+        """Variante del ancho (ajustado a uno disponible) y formato pedidos."""
+        if formato not in FORMATOS_RECURSO:
+            raise ValueError(f"Formato de imagen desconocido '{formato}' (use {', '.join(FORMATOS_RECURSO)})")
+        with self._lock:
+            self._actualizar()
+            clave = (self._ancho_variante(ancho), formato)
+            if clave not in self._variantes:
+                self._variantes[clave] = self._generar(*clave)
+            return self._variantes[clave]
+
+    def por_nombre(self, nombre):
+        """Variante a partir de su nombre versionado, o None si no es de la huella vigente."""
+        partes = nombre.split('.')
+        if len(partes) != 4 or partes[0] != self.base or not partes[2].isdigit():
+            return None
+        with self._lock:
+            self._actualizar()
+            if partes[1] != self.huella or int(partes[2]) not in self.anchos():
+                return None
+        if partes[3] not in FORMATOS_RECURSO:
+            return None
+        return self.variante(int(partes[2]), partes[3])
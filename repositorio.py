@@ -0,0 +1,313 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from busqueda import IndiceNombres
+from cache_columnar import leer_tabla, leer_tabla_compartida
+from cache_http import version_de_archivos
+from pronostico import preparar_pronostico
+
+# ============================================================
+# === REPOSITORIO DE DATOS Y MODELOS =========================
+# ============================================================
+# Todo lo que la API lee (Excel, joblib e índices) se agrupa en una
+# Instantanea inmutable. Una recarga construye una instantánea nueva
+# fuera del camino de las peticiones y la publica con una sola
+# asignación: cada petición toma la referencia una vez y trabaja sobre
+# una vista consistente aunque haya una recarga en curso.
+#
+# La API (api2.py) y Streamlit (streamlit_app.py) usan este mismo
+# repositorio y las consultas de consultas.py.
+
+DATA_PATH_RFM = 'resultado_rfm.xlsx'
+DATA_PATH_PERFIL = 'perfil_clusters_rfm.xlsx'
+DATA_PATH_MODELO = 'MachineLearning.joblib'
+DATA_PATH_MODELO_CLUSTER = 'modelo_cluster_rfm.joblib'
+
+# Salidas de pipeline_rfm.py: si existen, tienen prioridad sobre los Excel
+DATA_PATH_RFM_PARQUET = 'resultado_rfm.parquet'
+DATA_PATH_PERFIL_PARQUET = 'perfil_clusters_rfm.parquet'
+
+RUTAS_DATOS = [DATA_PATH_RFM, DATA_PATH_PERFIL, DATA_PATH_MODELO, DATA_PATH_MODELO_CLUSTER,
+               DATA_PATH_RFM_PARQUET, DATA_PATH_PERFIL_PARQUET]
+
+# DATOS_MEMORIA_COMPARTIDA=1: las tablas se abren desde una copia Arrow
+# mapeada en memoria (ver cache_columnar.py), compartida entre procesos.
+MEMORIA_COMPARTIDA = os.environ.get('DATOS_MEMORIA_COMPARTIDA') == '1'
+
+
+def ruta_vigente(parquet, excel):
+    """La salida columnar del pipeline si existe; si no, el Excel."""
+    return parquet if os.path.exists(parquet) else excel
+
+
+# ============================================================
+# === TIPOS COMPACTOS DE df_rfm ==============================
+# ============================================================
+# El texto repetido (Departamento, Ciudad, ...) pasa a categórico: un
+# diccionario de valores por columna y un código entero por fila. Los
+# enteros (Cluster_RFM, mes_favorito, recency, frequency, ...) se
+# reducen al tipo más chico que los contiene. Los float se dejan en
+# float64 para no alterar los valores que devuelve la API.
+
+COLUMNAS_CATEGORICAS = ['Departamento', 'Ciudad', 'Pago', 'Tipo', 'Comercio', 'Mercado']
+
+
+def compactar_tipos(df):
+    """Copia de df con columnas categóricas y enteros reducidos."""
+    df = df.copy(deep=False)
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns and df[columna].dtype == object:
+            df[columna] = df[columna].astype('category')
+    for columna in df.select_dtypes('integer').columns:
+        df[columna] = pd.to_numeric(df[columna], downcast='integer')
+    return df
+
+
+# ============================================================
+# === ÍNDICES DE BÚSQUEDA ====================================
+# ============================================================
+# Se construyen una sola vez al cargar los datos: cada filtro pasa
+# a ser un acceso O(1) a un diccionario en lugar de recorrer df_rfm.
+
+def normalizar_clave(valor):
+    """Normaliza un valor para usarlo como clave de los índices."""
+    return str(valor).strip().lower()
+
+
+def claves_normalizadas(serie):
+    """normalizar_clave de cada valor de la serie, como arreglo.
+
+    En columnas categóricas se normaliza solo el diccionario y se expande
+    con los códigos, sin crear un texto nuevo por fila.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories.astype(str).str.strip().str.lower().to_numpy()
+        return np.append(categorias, 'nan')[serie.cat.codes.to_numpy()]   # código -1 (nulo) -> 'nan'
+    return serie.astype(str).str.strip().str.lower().to_numpy()
+
+
+def _posiciones_por_clave(df, columna):
+    """Diccionario clave normalizada -> posiciones de fila en df."""
+    if columna not in df.columns:
+        return {}
+    claves = pd.Series(claves_normalizadas(df[columna]))
+    return claves.groupby(claves, sort=False).indices
+
+
+def _grupo_clientes(df, pos):
+    """Clientes únicos (sin nulos, en orden de aparición) de las filas pos."""
+    clientes = df['Cliente'].iloc[pos]
+    unicos = (clientes.notna() & ~clientes.duplicated()).to_numpy()
+    return {'clientes': clientes[unicos].tolist(), 'filas': pos[unicos]}
+
+
+def _valores_unicos(df, columna):
+    if columna not in df.columns:
+        return []
+    return df[columna].dropna().unique().tolist()
+
+
+def construir_indices(df):
+    """Precalcula los resultados de los endpoints de filtrado de df_rfm.
+
+    Los grupos guardan la lista de nombres ya lista para responder y las
+    posiciones de fila, usadas para paginar y proyectar columnas.
+    """
+    indices = {'todos': {'clientes': [], 'filas': np.array([], dtype=np.intp)},
+               'cliente': {}, 'departamento': {}, 'cluster': {}, 'mes': {},
+               'valores': {'departamento': [], 'cluster': [], 'mes': []},
+               'busqueda': IndiceNombres([])}
+    if df.empty or 'Cliente' not in df.columns:
+        return indices
+
+    indices['valores'] = {'departamento': _valores_unicos(df, 'Departamento'),
+                          'cluster': _valores_unicos(df, 'Cluster_RFM'),
+                          'mes': _valores_unicos(df, 'mes_favorito')}
+
+    indices['todos'] = _grupo_clientes(df, np.arange(len(df)))
+    indices['busqueda'] = IndiceNombres(indices['todos']['clientes'])
+
+    # Solo la posición: el registro se arma al consultarlo (ver consultas.obtener_cliente)
+    for clave, pos in _posiciones_por_clave(df, 'Cliente').items():
+        indices['cliente'][clave] = int(pos[0])
+
+    for clave, pos in _posiciones_por_clave(df, 'Departamento').items():
+        indices['departamento'][clave] = _grupo_clientes(df, pos)
+
+    for clave, pos in _posiciones_por_clave(df, 'Cluster_RFM').items():
+        grupo = _grupo_clientes(df, pos)
+        grupo['filas_preview'] = pos[:5]
+        grupo['preview'] = df.iloc[pos[:5]].to_dict(orient='records')
+        indices['cluster'][clave] = grupo
+
+    for clave, pos in _posiciones_por_clave(df, 'mes_favorito').items():
+        indices['mes'][clave] = pos
+
+    return indices
+
+
+# ============================================================
+# === CARGA DE INSTANTÁNEAS ==================================
+# ============================================================
+
+@dataclass(frozen=True)
+class Instantanea:
+    """Datos, modelos e índices cargados juntos; no se modifican nunca."""
+    df_rfm: pd.DataFrame
+    df_perfil: pd.DataFrame
+    data_joblib: Any
+    model: Any
+    m: Any
+    b: Any
+    df_model: Any
+    modelo_cluster: Any         # {'modelo', 'scaler', 'variables', ...} o None
+    pronostico: Any             # ParametrosPronostico o None
+    indices: dict
+    version: str
+    ultima_modificacion: datetime
+    tiempos_carga: dict         # fase -> segundos
+
+
+def _cargar_tabla(ruta, estricto, preparar=None):
+    try:
+        if MEMORIA_COMPARTIDA:
+            df = leer_tabla_compartida(ruta, preparar)
+        else:
+            df = leer_tabla(ruta)
+            if preparar is not None:
+                df = preparar(df)
+        print(f"✅ Archivo '{ruta}' cargado correctamente con {len(df)} registros.")
+        return df
+    except Exception as e:
+        if estricto:
+            raise
+        print(f"❌ Error al cargar '{ruta}': {e}")
+        return pd.DataFrame()
+
+
+def _cargar_joblib(ruta, estricto):
+    try:
+        data_joblib = joblib.load(ruta)
+        print(f"✅ Archivo '{ruta}' cargado correctamente.")
+        return data_joblib
+    except Exception as e:
+        if estricto:
+            raise
+        print(f"❌ Error al cargar el archivo {ruta}:", e)
+        return None
+
+
+def cargar_instantanea(estricto=False):
+    """Lee archivos y construye índices.
+
+    Con estricto=True cualquier error se propaga (se usa en las recargas
+    para conservar la instantánea anterior); si no, lo que falle queda vacío.
+    """
+    # La versión se toma antes de leer: si un archivo cambia durante la
+    # lectura, la siguiente comprobación vuelve a recargar.
+    version, ultima_modificacion = version_de_archivos(RUTAS_DATOS)
+    tiempos = {}
+
+    def medir(fase, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos[fase] = time.perf_counter() - inicio
+        return resultado
+
+    df_rfm = medir('excel_rfm', _cargar_tabla, ruta_vigente(DATA_PATH_RFM_PARQUET, DATA_PATH_RFM), estricto,
+                   compactar_tipos)
+    df_perfil = medir('excel_perfil', _cargar_tabla, ruta_vigente(DATA_PATH_PERFIL_PARQUET, DATA_PATH_PERFIL), estricto)
+    data_joblib = medir('joblib_modelo', _cargar_joblib, DATA_PATH_MODELO, estricto)
+    modelo = data_joblib or {}
+    modelo_cluster = medir('joblib_cluster', _cargar_joblib, DATA_PATH_MODELO_CLUSTER, estricto)
+
+    pronostico = medir('pronostico', preparar_pronostico, modelo.get('data'), modelo.get('m'), modelo.get('b'))
+    indices = medir('indices', construir_indices, df_rfm)
+    print(f"✅ Índices construidos ({len(indices['cliente'])} clientes; el de búsqueda se prepara aparte).")
+
+    return Instantanea(
+        df_rfm=df_rfm,
+        df_perfil=df_perfil,
+        data_joblib=data_joblib,
+        model=modelo.get('modelo'),
+        m=modelo.get('m'),
+        b=modelo.get('b'),
+        df_model=modelo.get('data'),
+        modelo_cluster=modelo_cluster,
+        pronostico=pronostico,
+        indices=indices,
+        version=version,
+        ultima_modificacion=ultima_modificacion,
+        tiempos_carga=tiempos
+    )
+
+
+class Repositorio:
+    """Mantiene la instantánea vigente y la reemplaza cuando cambian los archivos."""
+
+    def __init__(self):
+        self.actual = None
+        self.al_recargar = []          # funciones llamadas con la nueva instantánea
+        self._lock_recarga = threading.Lock()
+        self._version_fallida = None
+        self._vigilante = None
+        self._detener = threading.Event()
+
+    def cargar(self):
+        self._publicar(cargar_instantanea())
+        return self.actual
+
+    def _publicar(self, instantanea):
+        self.actual = instantanea      # asignación atómica: las peticiones ven la vieja o la nueva
+        for funcion in self.al_recargar:
+            funcion(instantanea)
+
+    def recargar(self, forzar=False):
+        """Recarga si cambió la versión de los archivos (o siempre, con forzar).
+
+        Devuelve True si se publicó una instantánea nueva. Si la carga falla
+        se mantiene la anterior.
+        """
+        with self._lock_recarga:
+            version, _ = version_de_archivos(RUTAS_DATOS)
+            if not forzar and self.actual is not None and version in (self.actual.version, self._version_fallida):
+                return False
+            try:
+                nueva = cargar_instantanea(estricto=True)
+            except Exception as e:
+                # No se reintenta hasta que los archivos vuelvan a cambiar
+                self._version_fallida = version
+                print(f"❌ Recarga cancelada, se conservan los datos anteriores: {e}")
+                return False
+            # La instantánea sale con el índice de búsqueda ya construido:
+            # la primera búsqueda tras la recarga no lo paga en la petición.
+            inicio = time.perf_counter()
+            nueva.indices['busqueda'].preparar()
+            nueva.tiempos_carga['indice_busqueda'] = time.perf_counter() - inicio
+            self._publicar(nueva)
+            print(f"🔄 Datos recargados (versión {nueva.version}).")
+            return True
+
+    def iniciar_vigilante(self, intervalo):
+        """Hilo en segundo plano que revisa los archivos cada `intervalo` segundos."""
+        if intervalo <= 0 or (self._vigilante is not None and self._vigilante.is_alive()):
+            return
+
+        def vigilar():
+            while not self._detener.wait(intervalo):
+                self.recargar()
+
+        self._detener.clear()
+        self._vigilante = threading.Thread(target=vigilar, name='vigilante-datos', daemon=True)
+        self._vigilante.start()
+
+    def detener_vigilante(self):
+        self._detener.set()
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# === ASIGNACIÓN DE CLUSTERS RFM =============================
+# ============================================================
+# modelo_cluster_rfm.joblib guarda {'modelo': KMeans, 'scaler':
+# StandardScaler, 'variables': [...], 'perfil_clusters': DataFrame}.
+# Aquí se aplica el mismo escalado del entrenamiento y se predice en
+# lotes, tanto desde pipeline_rfm.py como desde el endpoint de la API.
+
+LOTE_PREDICCION = 100_000
+
+
+def matriz_variables(df, variables, rellenar=None):
+    """DataFrame float64 con las variables del modelo, en su orden.
+
+    Sin `rellenar`, los faltantes o no numéricos lanzan ValueError; con
+    `rellenar` se sustituyen por ese valor.
+    """
+    faltantes = [v for v in variables if v not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan variables: {', '.join(faltantes)}")
+    X = df[variables].apply(pd.to_numeric, errors='coerce').astype('float64')
+    if rellenar is not None:
+        return X.fillna(rellenar)
+    invalidas = X.columns[X.isna().any()].tolist()
+    if invalidas:
+        raise ValueError(f"Valores vacíos o no numéricos en: {', '.join(invalidas)}")
+    return X
+
+
+def asignar_clusters(X, modelo_cluster, lote=LOTE_PREDICCION):
+    """Cluster_RFM de cada fila de X (ya en el orden de 'variables')."""
+    etiquetas = np.empty(len(X), dtype='int64')
+    for inicio in range(0, len(X), lote):
+        tramo = X.iloc[inicio:inicio + lote]
+        etiquetas[inicio:inicio + lote] = modelo_cluster['modelo'].predict(modelo_cluster['scaler'].transform(tramo))
+    return etiquetas
+
+
+def perfil_clusters(df, variables):
+    """Promedio de cada variable por cluster."""
+    return df.groupby('Cluster_RFM')[variables].mean().reset_index()
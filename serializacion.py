@@ -0,0 +1,67 @@
+import numpy as np
+import orjson
+import pandas as pd
+from flask import Response
+
+# ============================================================
+# === SERIALIZACIÓN JSON RÁPIDA ==============================
+# ============================================================
+# Todo se codifica con orjson, también las celdas de los DataFrames: las
+# columnas se pasan a listas de Python de una vez (tolist) y orjson arma
+# las filas, así una misma celda sale igual en /cliente, /clientes o
+# /export. Criterio único de tipos:
+#   NaN / NaT / None      -> null
+#   fechas (Timestamp)    -> ISO 8601 ("2025-07-31T00:00:00")
+#   escalares de numpy    -> número o booleano nativo
+#   flotantes             -> representación más corta que se relee igual
+
+OPCIONES_JSON = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+FORMATOS_TABLA = ('records', 'split')
+
+
+def _por_defecto(valor):
+    """Tipos que orjson no conoce de forma nativa."""
+    if valor is pd.NaT or valor is pd.NA:
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def a_json(payload):
+    """Bytes JSON de payload (dicts, listas, escalares y fragmentos de tabla)."""
+    return orjson.dumps(payload, default=_por_defecto, option=OPCIONES_JSON)
+
+
+def respuesta_json(payload, status=200):
+    """Equivalente a jsonify(payload) usando orjson."""
+    return Response(a_json(payload), status=status, mimetype='application/json')
+
+
+def filas(df):
+    """Tuplas con las celdas de cada fila de df, como objetos de Python."""
+    return zip(*(df[columna].tolist() for columna in df.columns))
+
+
+def registros(df):
+    """Un dict por fila de df ({"col": valor, ...})."""
+    columnas = [str(c) for c in df.columns]
+    return [dict(zip(columnas, fila)) for fila in filas(df)]
+
+
+def tabla_json(df, formato='records'):
+    """Fragmento JSON de un DataFrame, listo para incrustar en un payload.
+
+    formato='records' -> [{"col": valor, ...}, ...]
+    formato='split'   -> {"columns": [...], "data": [[...], ...]}
+    """
+    if formato not in FORMATOS_TABLA:
+        raise ValueError(f"Formato desconocido '{formato}' (use {' o '.join(FORMATOS_TABLA)})")
+    if formato == 'records':
+        contenido = registros(df)
+    else:
+        contenido = {'columns': [str(c) for c in df.columns], 'data': list(filas(df))}
+    return orjson.Fragment(a_json(contenido))
@@ -0,0 +1,101 @@
+import argparse
+import gc
+import os
+
+# ============================================================
+# === SERVIDOR DE PRODUCCIÓN PARA api2.py ====================
+# ============================================================
+# Importa api2 (Excel + joblib) UNA sola vez en el proceso maestro y
+# después crea los workers con fork: los DataFrames quedan compartidos
+# entre workers por copy-on-write en lugar de cargarse en cada uno.
+#
+# Uso:
+#   python servidor.py --workers 4 --hilos 2
+#   python servidor.py --modo hilos --hilos 8
+#
+# En Windows (sin fork ni gunicorn) se usa waitress con hilos.
+#
+# Tras una recarga en caliente (ver repositorio.py) cada worker carga
+# su propia copia de los datos nuevos; reiniciar el servidor vuelve a
+# compartir una sola copia.
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description="Servidor de producción de la API.")
+    parser.add_argument('--host', default=os.environ.get('API_HOST', '127.0.0.1'))
+    parser.add_argument('--puerto', type=int, default=int(os.environ.get('API_PUERTO', 5001)))
+    parser.add_argument('--modo', choices=['prefork', 'hilos'],
+                        default=os.environ.get('API_MODO', 'prefork'),
+                        help="prefork: varios procesos (gunicorn); hilos: un solo proceso con hilos")
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('API_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--hilos', type=int, default=int(os.environ.get('API_HILOS', 4)))
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('API_TIMEOUT', 60)))
+    return parser.parse_args()
+
+
+def _servir_gunicorn(app, args):
+    from gunicorn.app.base import BaseApplication
+
+    class AplicacionGunicorn(BaseApplication):
+        def __init__(self, aplicacion, opciones):
+            self.aplicacion = aplicacion
+            self.opciones = opciones
+            super().__init__()
+
+        def load_config(self):
+            for clave, valor in self.opciones.items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            return self.aplicacion
+
+    def al_crear_worker(server, worker):
+        # Los hilos no sobreviven al fork: cada worker arranca su vigilante
+        from api2 import iniciar_recarga_automatica
+        iniciar_recarga_automatica()
+
+    workers = 1 if args.modo == 'hilos' else args.workers
+    opciones = {
+        'bind': f'{args.host}:{args.puerto}',
+        'workers': workers,
+        'threads': args.hilos,
+        'worker_class': 'gthread' if args.hilos > 1 else 'sync',
+        'preload_app': True,
+        'timeout': args.timeout,
+        'post_fork': al_crear_worker,
+    }
+    print(f"🚀 gunicorn en http://{args.host}:{args.puerto} ({workers} workers x {args.hilos} hilos)")
+    AplicacionGunicorn(app, opciones).run()
+
+
+def _servir_waitress(app, args):
+    from waitress import serve
+    from api2 import iniciar_recarga_automatica
+    iniciar_recarga_automatica()
+    print(f"🚀 waitress en http://{args.host}:{args.puerto} ({args.hilos} hilos)")
+    serve(app, host=args.host, port=args.puerto, threads=args.hilos)
+
+
+def main():
+    args = _argumentos()
+
+    # Carga de datos y modelos en el proceso maestro, antes del fork
+    from api2 import crear_app, precargar
+    app = crear_app()
+    precargar()
+
+    # Todo lo cargado hasta aquí pasa a la generación permanente del GC:
+    # así los recolectores de los workers no tocan (ni copian) esas páginas.
+    gc.freeze()
+
+    try:
+        import gunicorn.app.base  # noqa: F401  (falla en Windows: requiere fcntl)
+        servir = _servir_gunicorn
+    except ImportError:
+        servir = _servir_waitress
+    servir(app, args)
+
+
+if __name__ == '__main__':
+    main()
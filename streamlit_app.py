@@ -1,7 +1,17 @@
+import arranque  # primero: con PERFIL_ARRANQUE=1 mide las importaciones siguientes
+
+import os
+
 import streamlit as st
-import pandas as pd
-import joblib
-from PIL import Image
+
+import consultas
+from pronostico import HORIZONTE_MAXIMO
+from repositorio import Repositorio
+
+# matplotlib (graficos.py), el almacén de transacciones y la imagen de
+# clusters se cargan dentro de la sección que los usa, con st.cache_*:
+# la consulta de clientes no espera por ellos y las reejecuciones no
+# los vuelven a leer.
 
 # ======================================================
 # 🔹 CONFIGURACIÓN GENERAL
@@ -9,121 +19,24 @@ from PIL import Image
 st.set_page_config(page_title="Predicción y Clientes", layout="centered")
 
 # ======================================================
-# 🔹 CARGA DE ARCHIVOS (Excel + Joblib)
+# 🔹 CARGA DE DATOS (repositorio compartido con la API)
 # ======================================================
-
-@st.cache_data
-def load_excels():
-    try:
-        df_rfm = pd.read_excel("resultado_rfm.xlsx")
-    except:
-        df_rfm = pd.DataFrame()
-
-    try:
-        df_perfil = pd.read_excel("perfil_clusters_rfm.xlsx")
-    except:
-        df_perfil = pd.DataFrame()
-
-    return df_rfm, df_perfil
-
+# Excel/Parquet, joblib e índices se cargan con el mismo Repositorio que
+# usa api2.py, una vez por proceso (st.cache_resource) y no por sesión.
+# El vigilante publica una instantánea nueva cuando cambian los archivos;
+# cada ejecución del script toma la vigente una sola vez. Con
+# DATOS_MEMORIA_COMPARTIDA=1 ambos procesos mapean la misma copia Arrow.
 
 @st.cache_resource
-def load_joblib():
-    try:
-        data_joblib = joblib.load("MachineLearning.joblib")
-        model = data_joblib.get("modelo")
-        m = data_joblib.get("m")
-        b = data_joblib.get("b")
-        df_model = data_joblib.get("data")
-        return model, m, b, df_model
-    except:
-        return None, None, None, None
-
-
-df_rfm, df_perfil = load_excels()
-model, m, b, df_model = load_joblib()
-
-# ======================================================
-# 🔹 FUNCIONES (equivalentes a los endpoints de la API)
-# ======================================================
-
-def predict_value(x):
-    """Simula el endpoint /predict"""
-    if m is None or b is None:
-        return None
-    return m * x + b
-
-
-def listar_clientes():
-    if df_rfm.empty:
-        return []
-    return df_rfm["Cliente"].dropna().unique().tolist()
-
-
-def obtener_cliente(nombre):
-    if df_rfm.empty:
-        return {}
-    data = df_rfm[df_rfm["Cliente"].astype(str).str.lower() == nombre.lower()]
-    if data.empty:
-        return {}
-    return data.to_dict(orient="records")[0]
-
-
-def listar_departamentos():
-    if df_rfm.empty:
-        return []
-    return df_rfm["Departamento"].dropna().unique().tolist()
-
-
-def clientes_por_departamento(dep):
-    if df_rfm.empty:
-        return []
-    data = df_rfm[df_rfm["Departamento"].astype(str).str.lower() == dep.lower()]
-    return data["Cliente"].dropna().unique().tolist()
-
-
-def listar_clusters():
-    if df_rfm.empty:
-        return []
-    return df_rfm["Cluster_RFM"].dropna().unique().tolist()
-
-
-def clientes_por_cluster(cluster):
-    if df_rfm.empty:
-        return []
-    data = df_rfm[df_rfm["Cluster_RFM"].astype(str) == str(cluster)]
-    clientes = data["Cliente"].dropna().unique().tolist()
-    return clientes, data.head(5).to_dict(orient="records")
-
+def cargar_repositorio():
+    repo = Repositorio()
+    repo.cargar()
+    repo.iniciar_vigilante(int(os.environ.get('API_RECARGA_SEGUNDOS', 30)))
+    return repo
 
-def perfil_clusters_preview():
-    if df_perfil.empty:
-        return []
-    return df_perfil.head(5).to_dict(orient="records")
-
-
-def listar_meses_favoritos():
-    if df_rfm.empty:
-        return []
-    return df_rfm["mes_favorito"].dropna().unique().tolist()
-
-
-def clientes_por_mes(mes):
-    if df_rfm.empty:
-        return []
-
-    mes = str(mes).lower()   # 🔥 FIX FINAL
-
-    data = df_rfm[df_rfm["mes_favorito"].astype(str).str.lower() == mes]
-
-    if data.empty:
-        return []
-
-    columnas = ["Cliente", "recency", "frequency"]
-    columnas = [c for c in columnas if c in data.columns]
-
-    return data[columnas].to_dict(orient="records")
 
+with arranque.fase('cargar repositorio'):
+    d = cargar_repositorio().actual
 
 
 # ======================================================
@@ -143,7 +56,7 @@ st.markdown("---")
 # x_input = st.number_input("Meses a predecir desde Julio 2025", step=1.0)
 
 # if st.button("Predecir"):
-#     y = predict_value(x_input + 31)
+#     y = consultas.predecir(d, x_input + 31)
 #     if y is not None:
 #         st.success(f"Resultado: y = {y:.4f}")
 #     else:
@@ -155,112 +68,77 @@ st.markdown("---")
 # 🔹 SECCIÓN — Gráfico de Regresión + Predicción
 # ======================================================
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-
 st.header("📊 Gráfico del Modelo + Predicción")
 
-try:
-    # === Cargar el archivo Excel original ===
-    df = pd.read_excel("MachineLearning.xlsx")
-
-    # Asegurar datetime
-    df['Fecha'] = pd.to_datetime(df['Fecha'])
-
-    # Indexar y resamplear mensual
-    df_indexed = df.set_index('Fecha')
-    df = df_indexed['Vlr Total'].resample('ME').sum().to_frame()
-    df.index.name = 'Fecha'
-
-    # === LIMPIEZA DE OUTLIERS POR IQR ===
-    Q1 = df['Vlr Total'].quantile(0.25)
-    Q3 = df['Vlr Total'].quantile(0.75)
-    IQR = Q3 - Q1
-
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-
-    df_replaced = df.copy()
 
-    for i in range(len(df)):
-        valor = df.iloc[i, 0]
-
-        # Si es outlier ⇒ reemplazar por promedio de vecinos
-        if valor < lower_bound or valor > upper_bound:
-            vecinos_idx = [j for j in range(i-3, i+4) if j != i and 0 <= j < len(df)]
-            promedio_vecinos = df.iloc[vecinos_idx, 0].mean()
-            df_replaced.iloc[i, 0] = promedio_vecinos
-
-    df = df_replaced.copy()
-
-except Exception as e:
-    st.error(f"No se pudo cargar MachineLearning.xlsx: {e}")
-    df = None
-
-# Si falló la carga, no continuar
-if df is None or df.empty:
-    st.stop()
+@st.cache_resource
+def almacen_ventas():
+    """Almacén de totales mensuales, uno por proceso (actualizar() serializa las sesiones)."""
+    from agregados_mensuales import AlmacenMensual
+    return AlmacenMensual()
 
-# Asegurar modelo cargado
-if m is None or b is None:
-    st.error("El modelo dentro de MachineLearning.joblib no se pudo cargar.")
-    st.stop()
 
-# ======================================================
-# 🔹 Construcción del gráfico
-# ======================================================
+@st.cache_data
+def cargar_serie_limpia(version_almacen):
+    """Serie mensual de ventas sin outliers (IQR), leída del almacén de agregados.
 
-# Crear variable tiempo
-df["Tiempo"] = np.arange(len(df))
+    version_almacen forma parte de la clave de caché: si entra una partición
+    nueva o cambia alguna, se recalcula.
+    """
+    from preprocesamiento import reemplazar_outliers_iqr
 
-# Input de mes futuro
-meses_futuros = st.number_input("Meses a predecir hacia adelante:", min_value=1, value=6)
+    df = almacen_ventas().serie()
+    df['Vlr Total'] = reemplazar_outliers_iqr(df['Vlr Total'])
+    return df
 
-# Punto X futuro
-x_future = df["Tiempo"].max() + meses_futuros
-y_future = m * x_future + b
 
-# Fecha futura equivalente
-ultima_fecha = df.index[-1]
-fecha_future = ultima_fecha + pd.DateOffset(months=meses_futuros)
+@st.cache_resource
+def servicio_graficos():
+    """Un renderizador por proceso: capa base y LRU de imágenes compartidas entre sesiones."""
+    from graficos import GraficoPrediccion
+    return GraficoPrediccion()
 
-# Extender valores del modelo
-tiempo_extendido = np.append(df["Tiempo"].values, x_future)
-y_extendido = m * tiempo_extendido + b
 
-# Fechas extendidas
-fechas_ext = list(df.index) + [fecha_future]
+def seccion_grafico():
+    try:
+        # === Totales mensuales: solo se leen las transacciones nuevas o modificadas ===
+        almacen = almacen_ventas()
+        almacen.actualizar()
+        df = cargar_serie_limpia(almacen.version)
 
-# ============================
-# GRAFICAR
-# ============================
+    except Exception as e:
+        st.error(f"No se pudo cargar MachineLearning.xlsx: {e}")
+        df = None
 
-fig, ax = plt.subplots(figsize=(14, 5))
+    # Si falló la carga, no dibujar (el resto de la página sigue)
+    if df is None or df.empty:
+        return
 
-# Datos reales
-ax.plot(df.index, df["Vlr Total"], marker="o", linewidth=2, label="Datos reales")
+    # Asegurar modelo cargado
+    if d.m is None or d.b is None or d.pronostico is None:
+        st.error("El modelo dentro de MachineLearning.joblib no se pudo cargar.")
+        return
 
-# Línea extendida
-ax.plot(fechas_ext, y_extendido, linestyle="--", linewidth=2, color="orange",
-        label="Regresión lineal extendida")
+    # Input de mes futuro
+    meses_futuros = st.number_input("Meses a predecir hacia adelante:", min_value=1,
+                                     max_value=HORIZONTE_MAXIMO, value=6)
 
-# Punto futuro
-ax.scatter([fecha_future], [y_future], color="red", s=150,
-           label=f"Predicción ({fecha_future.date()})")
+    # Predicción del último mes del horizonte, con su intervalo (mismo cálculo que /forecast)
+    prediccion = consultas.pronostico(d, meses_futuros).iloc[-1]
 
-ax.set_xlabel("Fecha")
-ax.set_ylabel("Valor Total")
-ax.set_title("Datos Originales + Modelo Extendido hasta la Predicción")
+    # La serie histórica se dibuja una vez por versión (almacén + modelo);
+    # aquí solo se compone la predicción para el horizonte pedido.
+    imagen = servicio_graficos().renderizar(f"{almacen.version}:{d.version}", df["Vlr Total"],
+                                            d.m, d.b, meses_futuros, "png")
+    st.image(imagen, width='stretch')
 
-plt.xticks(rotation=45)
-ax.legend()
-plt.tight_layout()
+    # Mostrar valor predicho
+    st.success(f"📌 Predicción para {prediccion['Fecha'].date()}: **{prediccion['y_pred']:,.0f}** "
+               f"(intervalo 95%: {prediccion['inferior']:,.0f} – {prediccion['superior']:,.0f})")
 
-st.pyplot(fig)
 
-# Mostrar valor predicho
-st.success(f"📌 Predicción para {fecha_future.date()}: **{y_future:,.0f}**")
+with arranque.fase('sección gráfico'):
+    seccion_grafico()
 
 
 
@@ -270,19 +148,20 @@ st.success(f"📌 Predicción para {fecha_future.date()}: **{y_future:,.0f}**")
 
 st.header("🧭 Consulta de Clientes")
 
-clientes = listar_clientes()
+texto_cliente = st.text_input("Buscar cliente", placeholder="Escribe parte del nombre")
+clientes = [r["Cliente"] for r in consultas.buscar_clientes(d, texto_cliente, 20)]
 
 if clientes:
     cliente = st.selectbox("Selecciona un cliente", clientes)
     if st.button("Ver información del cliente"):
-        info = obtener_cliente(cliente)
+        info = consultas.obtener_cliente(d, cliente)
         if info:
             for k, v in info.items():
                 st.write(f"**{k}:** {v}")
         else:
             st.warning("Cliente no encontrado.")
-else:
-    st.warning("No hay clientes disponibles.")
+elif texto_cliente.strip():
+    st.warning("No se encontraron clientes con ese nombre.")
 
 st.markdown("---")
 
@@ -292,12 +171,12 @@ st.markdown("---")
 
 st.subheader("🏙️ Clientes por Departamento")
 
-deps = listar_departamentos()
+deps = consultas.listar_departamentos(d)
 
 if deps:
     dep = st.selectbox("Departamento", deps)
     if st.button("Mostrar clientes por departamento"):
-        st.write(clientes_por_departamento(dep))
+        st.write(consultas.clientes_por_departamento(d, dep))
 else:
     st.warning("No se pudieron cargar los departamentos.")
 
@@ -331,15 +210,22 @@ Clientes hiperactivos: súper recientes, súper frecuentes y muy valiosos, pero
 # Imágen clusters
 ###############################
 
-from PIL import Image
-
+@st.cache_resource
+def imagen_clusters(ruta="descargar.png"):
+    """Recurso de la imagen (debe estar en la misma carpeta que el streamlit_app.py).
 
-# Cargar imagen (debe estar en la misma carpeta que el streamlit_app.py)
-imagen_descargar = Image.open("descargar.png")
+    Las variantes se generan una vez por contenido (ver recursos.py); cada
+    ejecución solo comprueba si el archivo cambió y reutiliza los bytes.
+    """
+    from recursos import Recurso
+    return Recurso(ruta)
 
-# Mostrarla en la app
 
-st.image(imagen_descargar, width='stretch')
+# Mostrarla en la app: WebP del ancho original (~75 KB en lugar de ~500 KB)
+try:
+    st.image(imagen_clusters().variante(formato="webp").datos, width='stretch')
+except FileNotFoundError:
+    st.warning("No se encontró la imagen de clusters (descargar.png).")
 
 
 
@@ -351,19 +237,19 @@ st.image(imagen_descargar, width='stretch')
 
 st.subheader("🧩 Perfil de Clusters")
 
-perfil = perfil_clusters_preview()
+perfil = consultas.perfil_clusters(d)
 
-if perfil:
+if not perfil.empty:
     st.dataframe(perfil)
 else:
     st.info("No hay datos disponibles.")
 
-clusters = listar_clusters()
+clusters = consultas.listar_clusters(d)
 
 if clusters:
     cluster_sel = st.selectbox("Cluster RFM", clusters)
     if st.button("Mostrar clientes del cluster"):
-        clientes_c, preview = clientes_por_cluster(cluster_sel)
+        clientes_c, preview = consultas.clientes_por_cluster(d, cluster_sel)
         st.write("Clientes:", clientes_c)
         st.write("Vista previa:")
         st.dataframe(preview)
@@ -376,17 +262,22 @@ st.markdown("---")
 
 st.subheader("📅 Clientes por Mes Favorito")
 
-meses = listar_meses_favoritos()
+meses = consultas.listar_meses_favoritos(d)
 
 if meses:
     mes_sel = st.selectbox("Mes favorito", meses)
     if st.button("Mostrar clientes del mes"):
-        st.dataframe(clientes_por_mes(mes_sel))
+        st.dataframe(consultas.clientes_por_mes(d, mes_sel))
 else:
     st.warning("No hay meses favoritos registrados.")
 
 st.markdown("---")
 
+if arranque.PERFIL_ARRANQUE:
+    arranque.informe('Streamlit', d.tiempos_carga)
+    with st.sidebar.expander("⏱️ Perfil de arranque"):
+        st.dataframe({"fase": list(arranque.tiempos), "segundos": list(arranque.tiempos.values())})
+
 
 
 
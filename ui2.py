@@ -2,35 +2,48 @@ import streamlit as st
 import requests
 from PIL import Image
 
+import cliente_api as api
+
 # ======================================================
 # 🔹 CONFIGURACIÓN GENERAL
 # ======================================================
 
 st.set_page_config(page_title="Predicción y Clientes", layout="centered")
 
-# 🔹 Puerto unificado para la API Flask
-API_URL = "http://127.0.0.1:5001"
+# 🔹 Puerto unificado para la API Flask (configurable con la variable API_URL)
+API_URL = api.API_URL
+
+# 🔹 Listas que usan los filtros: se piden todas a la vez y en paralelo
+# (los clientes no: se buscan por nombre con /buscar_clientes)
+listas, errores_listas = api.obtener_varios([
+    "/departamentos", "/perfil_clusters", "/clusters", "/meses_favoritos"
+])
+
+SUGERENCIAS_CLIENTES = 20
 
 # ======================================================
 # 🔹 SECCIÓN 1 — Predicción Lineal
 # ======================================================
 
 st.title("📈 Predicción Lineal:")
-st.write("Introduce un valor de **x** y la app te devolverá el valor predicho de **y** usando la API Flask.")
+st.write("Elige cuántos meses quieres predecir y la API Flask devolverá la predicción de cada mes con su intervalo.")
 
-x_input = st.number_input("Cuantos Meses Quieres Predecir DESDE Julio 2025", step=1.0, format="%.1f")
+# Las fechas y el desplazamiento desde el último mes conocido los calcula /forecast
+horizonte = st.number_input("Cuantos Meses Quieres Predecir", min_value=1, max_value=120, value=6, step=1)
 
 if st.button("Predecir"):
     try:
-        response = requests.post(f"{API_URL}/predict", json={'x': x_input+31}) # DEBE DE HABER 31 MESES PEUSTO QUE ESE ES EL NÚMERO INICIAL JULIO 2025
-        if response.status_code == 200:
-            result = response.json()
-            if 'y_pred' in result:
-                st.success(f"✅ Resultado: y = {result['y_pred']:.4f}")
-            else:
-                st.error(f"Error en la respuesta: {result}")
+        result = api.obtener("/forecast", {"horizonte": int(horizonte)})
+        pronostico = result.get("pronostico", [])
+        if pronostico:
+            ultimo = pronostico[-1]
+            st.success(f"✅ {ultimo['Fecha'][:10]}: y = {ultimo['y_pred']:,.0f} "
+                       f"(95%: {ultimo['inferior']:,.0f} – {ultimo['superior']:,.0f})")
+            st.dataframe(pronostico)
         else:
-            st.error(f"❌ Error al conectar con la API ({response.status_code})")
+            st.error(f"Error en la respuesta: {result}")
+    except requests.HTTPError as e:
+        st.error(f"❌ Error al conectar con la API ({e.response.status_code})")
     except Exception as e:
         st.error(f"⚠️ No se pudo conectar con la API de predicción.\n\n{e}")
 
@@ -45,7 +58,7 @@ st.markdown("---")
 # st.subheader("Mapa de Clusters")
 
 # try:
-#     image_url = f"{API_URL}/static/descargar.png"  # o "/imagen_descargar"
+#     image_url = f"{API_URL}/imagen_descargar?formato=webp"
 #     st.image(image_url, caption="Imagen desde la API", width="stretch")
 # except Exception as e:
 #     st.error(f"No se pudo cargar la imagen: {e}")
@@ -59,49 +72,46 @@ st.markdown("---")
 
 st.title("🧭 Consulta de Clientes y Clusters")
 
-# --- Obtener lista de clientes ---
-try:
-    response = requests.get(f"{API_URL}/clientes")
-    clientes = response.json().get("clientes", []) if response.status_code == 200 else []
-except Exception as e:
-    clientes = []
-    st.error(f"No se pudo conectar con la API: {e}")
+# --- Buscar cliente por nombre (solo viajan las mejores coincidencias) ---
+texto_cliente = st.text_input("Buscar cliente", placeholder="Escribe parte del nombre")
+
+clientes = []
+if texto_cliente.strip():
+    try:
+        resultados = api.obtener("/buscar_clientes", {"q": texto_cliente, "k": SUGERENCIAS_CLIENTES})
+        clientes = [r["Cliente"] for r in resultados.get("resultados", [])]
+    except Exception as e:
+        st.error(f"No se pudo conectar con la API: {e}")
 
 if clientes:
     cliente = st.selectbox("Selecciona un cliente", clientes)
     if st.button("Ver información del cliente"):
         try:
-            response = requests.get(f"{API_URL}/cliente/{cliente}")
-            if response.status_code == 200:
-                cliente_info = response.json()
-                st.write("### Información del cliente")
-                for k, v in cliente_info.items():
-                    st.markdown(f"**{k}:** {v}")
-            else:
-                st.warning("Cliente no encontrado.")
+            cliente_info = api.obtener(f"/cliente/{cliente}")
+            st.write("### Información del cliente")
+            for k, v in cliente_info.items():
+                st.markdown(f"**{k}:** {v}")
+        except requests.HTTPError:
+            st.warning("Cliente no encontrado.")
         except Exception as e:
             st.error(f"Error de conexión: {e}")
-else:
-    st.warning("No hay clientes disponibles o la API no está activa.")
+elif texto_cliente.strip():
+    st.warning("No se encontraron clientes con ese nombre.")
 
 st.markdown("---")
 
 # --- FILTRO POR DEPARTAMENTO ---
 st.subheader("🏙️ Filtrar por Departamento")
 
-try:
-    response = requests.get(f"{API_URL}/departamentos")
-    departamentos = response.json().get("departamentos", []) if response.status_code == 200 else []
-except Exception as e:
-    departamentos = []
-    st.error(f"No se pudo conectar con la API: {e}")
+departamentos = listas.get("/departamentos", {}).get("departamentos", [])
+if "/departamentos" in errores_listas:
+    st.error(f"No se pudo conectar con la API: {errores_listas['/departamentos']}")
 
 if departamentos:
     departamento = st.selectbox("Selecciona un departamento", departamentos)
     if st.button("Mostrar clientes del departamento"):
         try:
-            response = requests.get(f"{API_URL}/clientes_por_departamento/{departamento}")
-            data = response.json().get("clientes", [])
+            data = api.obtener(f"/clientes_por_departamento/{departamento}").get("clientes", [])
             st.write(data if data else "No hay clientes en este departamento.")
         except Exception as e:
             st.error(f"Error de conexión: {e}")
@@ -113,30 +123,25 @@ st.markdown("---")
 # --- PERFIL DE CLUSTERS ---
 st.subheader("🧩 Vista previa de Clusters y Perfiles")
 
-try:
-    response = requests.get(f"{API_URL}/perfil_clusters")
-    perfil_data = response.json().get("perfil", []) if response.status_code == 200 else []
+if "/perfil_clusters" in errores_listas:
+    st.error(f"Error de conexión con la API: {errores_listas['/perfil_clusters']}")
+else:
+    perfil_data = listas["/perfil_clusters"].get("perfil", [])
     if perfil_data:
         st.dataframe(perfil_data)
     else:
         st.info("No se encontraron datos en perfil_clusters_rfm.xlsx.")
-except Exception as e:
-    st.error(f"Error de conexión con la API: {e}")
 
 # --- CLUSTERS RFM ---
-try:
-    response = requests.get(f"{API_URL}/clusters")
-    clusters = response.json().get("clusters", []) if response.status_code == 200 else []
-except Exception as e:
-    clusters = []
-    st.error(f"No se pudo conectar con la API: {e}")
+clusters = listas.get("/clusters", {}).get("clusters", [])
+if "/clusters" in errores_listas:
+    st.error(f"No se pudo conectar con la API: {errores_listas['/clusters']}")
 
 if clusters:
     cluster_sel = st.selectbox("Selecciona un Cluster RFM", clusters)
     if st.button("Mostrar clientes del cluster"):
         try:
-            response = requests.get(f"{API_URL}/clientes_por_cluster/{cluster_sel}")
-            data = response.json().get("clientes", [])
+            data = api.obtener(f"/clientes_por_cluster/{cluster_sel}").get("clientes", [])
             st.dataframe(data if data else [])
         except Exception as e:
             st.error(f"Error de conexión: {e}")
@@ -146,19 +151,15 @@ st.markdown("---")
 # --- FILTRO POR MES FAVORITO ---
 st.subheader("📅 Filtrar por Mes Favorito")
 
-try:
-    response = requests.get(f"{API_URL}/meses_favoritos")
-    meses = response.json().get("meses", []) if response.status_code == 200 else []
-except Exception as e:
-    meses = []
-    st.error(f"No se pudo conectar con la API: {e}")
+meses = listas.get("/meses_favoritos", {}).get("meses", [])
+if "/meses_favoritos" in errores_listas:
+    st.error(f"No se pudo conectar con la API: {errores_listas['/meses_favoritos']}")
 
 if meses:
     mes_sel = st.selectbox("Selecciona un mes favorito", meses)
     if st.button("Mostrar clientes del mes"):
         try:
-            response = requests.get(f"{API_URL}/clientes_por_mes/{mes_sel}")
-            data = response.json().get("datos", [])
+            data = api.obtener(f"/clientes_por_mes/{mes_sel}").get("datos", [])
             st.dataframe(data if data else [])
         except Exception as e:
             st.error(f"Error de conexión: {e}")